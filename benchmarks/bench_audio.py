@@ -0,0 +1,228 @@
+"""Benchmarks for the real-time audio path. No sound device or sample files needed.
+
+    python -m benchmarks.bench_audio
+    python -m benchmarks.bench_audio --blocksizes 128 512 --polyphony 0 64 --json bench.json
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+import numpy as np
+from pedalboard import Pedalboard
+from rich.console import Console
+from rich.table import Table
+
+from src.nonomi.audio.bus import Bus
+from src.nonomi.audio.drums import Drums
+from src.nonomi.audio.engine import MasterFX
+from src.nonomi.audio.manager import AudioManager, SequencerClock
+from src.nonomi.audio.modulation import ModTarget, ModulationMatrix, Route
+from src.nonomi.audio.piano import NOTE_TO_SEMITONE
+from src.nonomi.audio.sampler import AudioSampler, velocity_lut
+from src.nonomi.utils.ringbuffer import AudioRingBuffer
+from src.nonomi.utils.visualizer import Visualizer
+
+SAMPLERATE = 44100
+BLOCKSIZES = [64, 128, 256, 512, 1024, 2048, 4096]
+POLYPHONY  = [0, 16, 64, 128]
+FX_CHAINS  = ["master", "dry"]
+
+def decaying_tone(freq: float, seconds: float, samplerate: int = SAMPLERATE) -> np.ndarray:
+    t = np.arange(int(seconds * samplerate)) / samplerate
+    tone = np.sin(2 * np.pi * freq * t) * np.exp(-t * 0.6) * 0.3
+    return np.column_stack([tone, tone]).astype(np.float32)
+
+class SyntheticSampler(AudioSampler):
+    """AudioSampler filled with generated tones instead of decoded files."""
+    def __init__(self, seconds: float = 6.0):
+        super().__init__(sample_dir=".", use_cache=False)
+        self.seconds = seconds
+
+    def load_samples(self):
+        for note in self.notes:
+            for octv in self.octaves:
+                key = f"{note}{octv}"
+                semitone = NOTE_TO_SEMITONE[note] + octv * 12
+                freq = 440.0 * 2 ** ((semitone - 57) / 12)
+
+                self.samples[f"{key}v1"] = {"data": decaying_tone(freq, self.seconds), "samplerate": SAMPLERATE}
+                self.layers[key] = (((f"{key}v1",),), velocity_lut(1), [0])
+                self._sampled[semitone] = key
+
+    def load_drums(self):
+        for name, freq in (("kick", 60.0), ("snare", 200.0), ("hihat", 8000.0)):
+            self.drums[name] = {"data": decaying_tone(freq, 0.3), "samplerate": SAMPLERATE}
+
+def make_sampler() -> SyntheticSampler:
+    sampler = SyntheticSampler()
+    sampler.load_samples()
+    sampler.load_drums()
+    return sampler
+
+def percentiles(samples_ns: np.ndarray) -> dict:
+    us = samples_ns / 1000.0
+    return {
+        "p50_us": float(np.percentile(us, 50)),
+        "p99_us": float(np.percentile(us, 99)),
+        "max_us": float(us.max()),
+    }
+
+def bench_callback(sampler, blocksize: int, polyphony: int, fx: str, blocks: int) -> dict:
+    """Drive AudioManager._audio_callback directly and time every block."""
+    manager = AudioManager(
+        sampler, samplerate=SAMPLERATE, blocksize=blocksize,
+        max_voices=max(64, polyphony + 32), tail_threshold_db=None,
+    )
+    if fx == "dry":
+        manager.master_fx.board = Pedalboard([])
+
+    warmup, alloc_blocks = 32, min(blocks, 256)
+
+    # Sustained voices on top of the normal sequencing, long enough to outlast every pass
+    pad = decaying_tone(220.0, (warmup + blocks + alloc_blocks) * blocksize / SAMPLERATE + 1.0)
+    for _ in range(polyphony):
+        manager.voices.trigger(pad, velocity=0.01)
+
+    # Bars are made on the control side, so the lookahead is topped up outside the timed region
+    outdata = np.zeros((blocksize, 2), dtype=np.float32)
+    for _ in range(warmup):
+        manager.fill_patterns()
+        manager._audio_callback(outdata, blocksize, None, None)
+
+    times = np.zeros(blocks, dtype=np.int64)
+    for i in range(blocks):
+        manager.fill_patterns()
+        start = time.perf_counter_ns()
+        manager._audio_callback(outdata, blocksize, None, None)
+        times[i] = time.perf_counter_ns() - start
+    voices = manager.voice_count()
+
+    # Separate pass: tracemalloc slows everything down, so it doesn't share the timing run
+    tracemalloc.start()
+    peak = 0
+    for _ in range(alloc_blocks):
+        manager.fill_patterns()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        manager._audio_callback(outdata, blocksize, None, None)
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+
+    deadline_us = blocksize / SAMPLERATE * 1e6
+    result = {
+        "blocksize": blocksize,
+        "polyphony": polyphony,
+        "fx": fx,
+        "voices": voices,
+        "deadline_us": deadline_us,
+        "peak_alloc_bytes": int(peak),
+        **percentiles(times),
+    }
+    result["headroom"] = 1.0 - result["p99_us"] / deadline_us
+    return result
+
+def bench_micro(sampler, iterations: int) -> list[dict]:
+    """Per-call timings for the pieces the callback is built from, at blocksize 512."""
+    frames = 512
+    results = []
+
+    def run(name, fn):
+        for _ in range(min(iterations, 100)):
+            fn()
+        times = np.zeros(iterations, dtype=np.int64)
+        for i in range(iterations):
+            start = time.perf_counter_ns()
+            fn()
+            times[i] = time.perf_counter_ns() - start
+        results.append({"name": name, **percentiles(times)})
+
+    clock = SequencerClock(bpm=156.0, samplerate=SAMPLERATE)
+    run("SequencerClock.advance", lambda: clock.advance(frames))
+
+    manager = AudioManager(sampler, samplerate=SAMPLERATE, blocksize=frames)
+    run("AudioManager._sequence_bar (control side)", manager._sequence_bar)
+
+    # Same path as the engine: the pattern triggers voices, the drum bus mixes them
+    drums = Drums(sampler, samplerate=SAMPLERATE, max_block=frames)
+    drum_bus = Bus("drums", drums, samplerate=SAMPLERATE, max_block=frames)
+    hihat = drums.stereo("hihat")
+
+    def drum_block():
+        if len(drums.voices) < 8:
+            drums.voices.trigger(hihat, velocity=0.5)
+        drum_bus.render(frames)
+    run("Drum bus render (8 hits)", drum_block)
+
+    master = MasterFX(samplerate=SAMPLERATE)
+    noise = (np.random.default_rng(0).standard_normal((frames, 2)) * 0.1).astype(np.float32)
+    run("MasterFX.process", lambda: master.process(noise))
+
+    # Every target routed, inputs moving each call so the matrix never settles
+    targets = {name: ModTarget(0.0, 1.0, lambda value: None) for name in ("a", "b", "c", "d", "e")}
+    matrix = ModulationMatrix(targets, samplerate=SAMPLERATE, routes=[
+        Route(source, target, curve="smooth", smoothing=1.0)
+        for source in ("brightness", "hue") for target in targets
+    ])
+    wobble = iter(np.tile(np.linspace(0.0, 1.0, 1000), 1000))
+
+    def modulate():
+        matrix.set_input("brightness", next(wobble))
+        matrix.process(frames)
+    run("ModulationMatrix.process (10 routes)", modulate)
+
+    viz = Visualizer(samplerate=SAMPLERATE)
+    ring = AudioRingBuffer(SAMPLERATE)
+
+    def viz_frame():
+        ring.write(noise)
+        viz._viz(ring)
+        viz._render(viz.smoothed)
+    run("Visualizer._viz + _render", viz_frame)
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="NonomiBeat audio path benchmarks")
+    parser.add_argument("--blocksizes", type=int, nargs="+", default=BLOCKSIZES)
+    parser.add_argument("--polyphony", type=int, nargs="+", default=POLYPHONY)
+    parser.add_argument("--fx", nargs="+", choices=FX_CHAINS, default=FX_CHAINS)
+    parser.add_argument("--blocks", type=int, default=2000, help="Timed blocks per configuration")
+    parser.add_argument("--iterations", type=int, default=5000, help="Calls per micro-benchmark")
+    parser.add_argument("--json", help="Also write the raw results to this file")
+    args = parser.parse_args()
+
+    console = Console(width=max(Console().width, 120))
+    sampler = make_sampler()
+
+    table = Table(title="AudioManager._audio_callback")
+    for col in ("block", "poly", "fx", "voices", "p50 µs", "p99 µs", "max µs", "deadline µs", "headroom", "alloc KiB"):
+        table.add_column(col, justify="right")
+
+    callback = []
+    for fx in args.fx:
+        for blocksize in args.blocksizes:
+            for polyphony in args.polyphony:
+                r = bench_callback(sampler, blocksize, polyphony, fx, args.blocks)
+                callback.append(r)
+                table.add_row(
+                    str(r["blocksize"]), str(r["polyphony"]), r["fx"], str(r["voices"]),
+                    f"{r['p50_us']:.1f}", f"{r['p99_us']:.1f}", f"{r['max_us']:.1f}",
+                    f"{r['deadline_us']:.0f}", f"{r['headroom']:.0%}", f"{r['peak_alloc_bytes'] / 1024:.1f}",
+                )
+    console.print(table)
+
+    micro = bench_micro(sampler, args.iterations)
+    micro_table = Table(title="Micro-benchmarks (512 frames)")
+    for col in ("name", "p50 µs", "p99 µs", "max µs"):
+        micro_table.add_column(col, justify="right")
+    for r in micro:
+        micro_table.add_row(r["name"], f"{r['p50_us']:.1f}", f"{r['p99_us']:.1f}", f"{r['max_us']:.1f}")
+    console.print(micro_table)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"callback": callback, "micro": micro}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
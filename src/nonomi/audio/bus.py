@@ -0,0 +1,53 @@
+import numpy as np
+
+class Bus:
+    """One mix bus: a source (anything with `mix_into(bus)`, e.g. a VoicePool or Drums) mixed into
+    the bus's own buffer, then optional FX (a Pedalboard), stereo width and gain. `output` holds the
+    last block so it can be summed into the master and, when rendering stems, written out on its own.
+
+    `width` scales the side signal (1.0 leaves the image alone, 0.0 folds it to mono)."""
+    def __init__(self, name: str, source, gain: float = 1.0, fx=None, samplerate: int = 44100,
+                 max_block: int = 4096):
+        self.name = name
+        self.source = source
+        self.gain = gain
+        self.width = 1.0
+        self.fx = fx
+        self.muted = False
+        self.samplerate = samplerate
+
+        self._buffer = np.zeros((max_block, 2), dtype=np.float32)
+        self._side = np.zeros(max_block, dtype=np.float32)
+        self.output = self._buffer[:0]
+
+    def render(self, frames: int) -> np.ndarray:
+        if frames > len(self._buffer):
+            self._buffer = np.zeros((frames, 2), dtype=np.float32)
+
+        out = self._buffer[:frames]
+        out.fill(0.0)
+        # Keep the source advancing while muted so voices stay in time
+        self.source.mix_into(out)
+
+        if self.fx is not None and len(self.fx) > 0:
+            out = self.fx(out, self.samplerate, reset=False)
+        if self.width != 1.0:
+            self._widen(out)
+        if self.muted:
+            out.fill(0.0)
+        elif self.gain != 1.0:
+            out *= self.gain
+
+        self.output = out
+        return out
+
+    def _widen(self, out: np.ndarray):
+        """Mid-side width in place: L += (w - 1) * S, R -= (w - 1) * S."""
+        if len(out) > len(self._side):
+            self._side = np.zeros(len(out), dtype=np.float32)
+
+        side = self._side[:len(out)]
+        np.subtract(out[:, 0], out[:, 1], out=side)
+        side *= 0.5 * (self.width - 1.0)
+        out[:, 0] += side
+        out[:, 1] -= side
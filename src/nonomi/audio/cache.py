@@ -0,0 +1,92 @@
+import hashlib
+import os
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+ENVELOPE_HOP = 512
+SILENCE_DB = -80.0
+
+def default_cache_dir() -> Path:
+    return Path.home() / "NonomiBeat" / "cache"
+
+def decode_sample(file_path) -> tuple[np.ndarray, int]:
+    """Decode a sample to DC-corrected float32 stereo."""
+    data, samplerate = sf.read(str(file_path), dtype='float32')
+    data = data - np.mean(data)
+    if data.ndim == 1:
+        data = np.column_stack([data, data])
+
+    return data.astype(np.float32), samplerate
+
+def level_envelope(data: np.ndarray, hop: int = ENVELOPE_HOP) -> np.ndarray:
+    """Peak level of every `hop`-sample window, lets the mixer skip blocks it can't hear."""
+    if len(data) == 0:
+        return np.zeros(0, dtype=np.float32)
+
+    peaks = np.abs(data).max(axis=1) if data.ndim == 2 else np.abs(data)
+    return np.maximum.reduceat(peaks, np.arange(0, len(data), hop)).astype(np.float32)
+
+def trim_silence(data: np.ndarray, hop: int = ENVELOPE_HOP, floor_db: float = SILENCE_DB):
+    """Cut everything after the last window above `floor_db`, returns (trimmed data, its envelope)."""
+    env = level_envelope(data, hop)
+    audible = np.flatnonzero(env >= 10 ** (floor_db / 20))
+    end = int(audible[-1]) + 1 if len(audible) else 1
+    return data[:end * hop], env[:end]
+
+def envelope_path(target: Path) -> Path:
+    return target.with_name(f"{target.stem}-env.npy")
+
+def _save_atomic(data: np.ndarray, target: Path):
+    """Write through a temp file so other instances never mmap a half-written array."""
+    tmp = target.with_name(f"{target.stem}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, data)
+    os.replace(tmp, target)
+
+def decode_to_cache(file_path, target) -> int:
+    """Process-pool worker: decode a sample into the cache, returns its samplerate."""
+    data, samplerate = decode_sample(file_path)
+    _save_atomic(data, Path(target))
+    return samplerate
+
+def process_to_cache(file_path, target, raw_target, fx_params: dict):
+    """Process-pool worker: decode (or reuse the cached decode) and run PianoFX into the cache."""
+    from src.nonomi.audio.engine import PianoFX
+
+    raw_target = Path(raw_target) if raw_target else None
+    if raw_target and raw_target.exists():
+        raw = np.load(raw_target)
+    else:
+        raw, _ = decode_sample(file_path)
+
+    # A fresh chain per sample so no filter state leaks between samples
+    fx = PianoFX(**fx_params)
+    data, env = trim_silence(fx.process(raw))
+    _save_atomic(env, envelope_path(Path(target)))
+    _save_atomic(data, Path(target))
+
+class SampleCache:
+    """On-disk .npy cache of decoded/processed samples, keyed by source file stat and a tag."""
+    def __init__(self, cache_dir=None):
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, file_path, tag: str) -> Path:
+        file_path = Path(file_path).resolve()
+        st = file_path.stat()
+        key = f"{file_path}|{st.st_mtime_ns}|{st.st_size}|{tag}"
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        return self.cache_dir / f"{file_path.stem}-{digest[:16]}.npy"
+
+    @staticmethod
+    def load(target: Path) -> np.ndarray | None:
+        """Memory-map a cached array, pages are only read in when a voice touches them."""
+        if not target.exists():
+            return None
+
+        try:
+            return np.load(target, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
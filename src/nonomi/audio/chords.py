@@ -0,0 +1,97 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.nonomi.audio.cache import trim_silence
+
+VELOCITY_BUCKETS = 2
+STRUM_PATTERNS = 2
+VOICING_VARIANTS = 2
+
+def render_chord(parts: list[tuple[np.ndarray, float, int]], max_frames: int | None = None,
+                 fade_frames: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """Mix (data, velocity, delay) parts into one buffer, returns (data, level envelope).
+    With `max_frames` the chord is cut there, its last `fade_frames` faded out."""
+    length = max(delay + len(data) for data, _, delay in parts)
+    cut = max_frames is not None and length > max_frames
+    if cut:
+        length = max_frames
+
+    out = np.zeros((length, 2), dtype=np.float32)
+    for data, velocity, delay in parts:
+        frames = min(len(data), length - delay)
+        if frames > 0:
+            out[delay:delay + frames] += data[:frames] * np.float32(velocity)
+
+    if cut and fade_frames > 0:
+        fade = min(fade_frames, length)
+        out[-fade:] *= np.linspace(1.0, 0.0, fade, dtype=np.float32)[:, None]
+
+    return trim_silence(out)
+
+class ChordCache:
+    """LRU of pre-rendered strummed chords, keyed by whatever identifies the chord musically.
+
+    A chord played from the cache is one voice instead of one per note. Misses are rendered
+    inline until `start_background()`, after which they go to a worker thread and the first
+    few plays of a new chord still use separate voices. Entries are cut at `max_frames` (faded
+    over `fade_frames`) so a budget holds a whole key's worth of chords.
+    """
+    def __init__(self, memory_budget_mb: float = 512.0, max_frames: int | None = None, fade_frames: int = 0):
+        self.budget = int(memory_budget_mb * 1024 * 1024)
+        self.max_frames = max_frames
+        self.fade_frames = fade_frames
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: OrderedDict[tuple, tuple[np.ndarray, np.ndarray]] = OrderedDict()
+        self._pending: set[tuple] = set()
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+
+    def start_background(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chord-render")
+
+    def get(self, key: tuple) -> tuple[np.ndarray, np.ndarray] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return entry
+
+    def render(self, key: tuple, parts: list[tuple[np.ndarray, float, int]]):
+        """Render `parts` into the cache under `key`, in the background once started."""
+        with self._lock:
+            if key in self._entries or key in self._pending:
+                return
+            self._pending.add(key)
+
+        if self._executor is None:
+            self._render(key, parts)
+        else:
+            self._executor.submit(self._render, key, parts)
+
+    def _render(self, key: tuple, parts):
+        entry = render_chord(parts, self.max_frames, self.fade_frames)
+        with self._lock:
+            self._pending.discard(key)
+            self._entries[key] = entry
+            self.nbytes += entry[0].nbytes
+            while self.nbytes > self.budget and len(self._entries) > 1:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
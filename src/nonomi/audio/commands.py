@@ -0,0 +1,37 @@
+class CommandQueue:
+    """Single-producer/single-consumer ring buffer of (command, value) pairs.
+
+    The control thread pushes and the audio thread pops. Each side only ever writes its own
+    index, and the producer fills the slot before publishing the new head, so neither side
+    needs a lock and the consumer never blocks.
+    """
+    def __init__(self, capacity: int = 256):
+        self.capacity = capacity + 1  # one slot stays empty to tell full from empty
+        self._slots: list[tuple | None] = [None] * self.capacity
+        self._head = 0  # written by the producer only
+        self._tail = 0  # written by the consumer only
+
+    def push(self, command: str, value=None) -> bool:
+        """Queue a command, returns False (and drops it) if the ring is full."""
+        head = self._head
+        nxt = (head + 1) % self.capacity
+        if nxt == self._tail:
+            return False
+
+        self._slots[head] = (command, value)
+        self._head = nxt
+        return True
+
+    def pop(self) -> tuple | None:
+        """Next (command, value) pair, or None when empty."""
+        tail = self._tail
+        if tail == self._head:
+            return None
+
+        item = self._slots[tail]
+        self._slots[tail] = None
+        self._tail = (tail + 1) % self.capacity
+        return item
+
+    def __len__(self) -> int:
+        return (self._head - self._tail) % self.capacity
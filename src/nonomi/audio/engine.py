@@ -1,14 +1,69 @@
+import math
+
 import numpy as np
 from pedalboard import Pedalboard, Limiter, MP3Compressor, LowpassFilter, Bitcrush
 
+class SmoothedParam:
+    """Control-rate parameter. Any thread may set the target; the audio thread calls `tick` once per
+    block to glide towards it (one-pole, `time_constant` seconds). `tick` only reports a change once the
+    value has moved `min_delta` (relative when `relative`) since it was last applied, so costly updates
+    like filter coefficients aren't redone every block for inaudible steps."""
+    def __init__(self, value: float, time_constant: float = 0.1, samplerate: int = 44100,
+                 min_delta: float = 0.0, relative: bool = False,
+                 low: float = -math.inf, high: float = math.inf):
+        self.samplerate = samplerate
+        self.time_constant = time_constant
+        self.min_delta = min_delta
+        self.relative = relative
+        self.low, self.high = low, high
+
+        self.value = self.applied = self.target = self._clamp(value)
+        self._coeff_frames = 0
+        self._coeff = 1.0
+
+    def _clamp(self, value: float) -> float:
+        return max(self.low, min(self.high, float(value)))
+
+    def set_target(self, target: float):
+        self.target = self._clamp(target)  # a single float store, safe from any thread
+
+    def jump(self, value: float):
+        """Set immediately without gliding (next tick applies it)."""
+        self.target = self.value = self._clamp(value)
+
+    def tick(self, frames: int) -> bool:
+        """Audio thread: advance by one block of `frames`. True when the caller should apply `applied`."""
+        if frames != self._coeff_frames:
+            self._coeff_frames = frames
+            self._coeff = 1.0 if self.time_constant <= 0 else 1.0 - math.exp(-frames / (self.time_constant * self.samplerate))
+
+        self.value += (self.target - self.value) * self._coeff
+        delta = abs(self.value - self.applied)
+        if self.relative:
+            delta /= max(abs(self.applied), 1e-9)
+
+        if delta > self.min_delta or (delta > 0 and self.value == self.target):
+            self.applied = self.value
+            return True
+        return False
+
 class PianoFX:
     """PianoFX chain with a simple lowpass filter and stereo widener."""
-    def __init__(self, samplerate: int = 44100):
+    def __init__(self, samplerate: int = 44100, cutoff_hz: float = 1000.0, widener_amount: float = 0.5):
         self.samplerate = samplerate
         self.board = Pedalboard([
-            LowpassFilter(cutoff_frequency_hz=1000.0),
+            LowpassFilter(cutoff_frequency_hz=cutoff_hz),
         ])
-        self.widener_amount = 0.5
+        self.widener_amount = widener_amount
+
+    @property
+    def params(self) -> dict:
+        """Constructor arguments that reproduce this chain, used to key cached output."""
+        return {
+            "samplerate": self.samplerate,
+            "cutoff_hz": float(self.board[0].cutoff_frequency_hz),
+            "widener_amount": float(self.widener_amount),
+        }
 
     def process(self, audio: np.ndarray) -> np.ndarray:
         if audio.ndim == 1:
@@ -35,10 +90,14 @@ class MasterFX:
     """Master FX"""
     def __init__(self, samplerate: int = 44100):
         self.samplerate = samplerate
-        self._lpf_cutoff = 2000.0
+        # ~2 s glide matches the old 5% step per 100 ms update, 1% moves are below hearing the difference
+        self.cutoff = SmoothedParam(
+            2000.0, time_constant=2.0, samplerate=samplerate,
+            min_delta=0.01, relative=True, low=200.0, high=15000.0,
+        )
         self.board = Pedalboard([
             #MP3Compressor(vbr_quality=8),
-            LowpassFilter(cutoff_frequency_hz=self._lpf_cutoff),
+            LowpassFilter(cutoff_frequency_hz=self.cutoff.value),
             Limiter(threshold_db=-0.5),
             Bitcrush(bit_depth=32)
         ])
@@ -48,14 +107,20 @@ class MasterFX:
         if audio.ndim == 1:
             audio = np.column_stack([audio, audio])
 
+        # The only place the live board is touched, so it never changes mid-process
+        if self.cutoff.tick(len(audio)):
+            self.board[0].cutoff_frequency_hz = self.cutoff.applied
+
         processed = self.board(audio, self.samplerate, reset=False)
-        processed = np.tanh(processed * 0.8) * self._master_vol
-        return processed.astype(np.float32)
+        if processed.dtype != np.float32:
+            processed = processed.astype(np.float32)
 
-    def update_filter(self, brightness: float):
-        """Camera brightness modulates the master LPF"""
-        target = 200 + brightness * (15000 - 200)
-        target = max(200.0, min(target, 15000.0))
+        # In place: the board's output is the only buffer allocated per block
+        processed *= 0.8
+        np.tanh(processed, out=processed)
+        processed *= self._master_vol
+        return processed
 
-        self._lpf_cutoff += (target - self._lpf_cutoff) * 0.05
-        self.board[0].cutoff_frequency_hz = self._lpf_cutoff
+    def update_filter(self, brightness: float):
+        """Camera brightness modulates the master LPF. Safe from any thread, the audio thread does the ramp."""
+        self.cutoff.set_target(200 + brightness * (15000 - 200))
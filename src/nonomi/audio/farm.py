@@ -0,0 +1,186 @@
+import asyncio
+import multiprocessing
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+from src.nonomi.audio.render import follow_input
+from src.nonomi.utils.ringbuffer import SharedAudioRing
+
+@dataclass
+class StreamJob:
+    """One independent stream to render: its own engine, seed and output file."""
+    path: Path
+    seconds: float
+    seed: int
+    input_spec: str | None = None  # followed by audio time, see open_input
+
+@dataclass
+class WorkerStats:
+    """Throughput of one worker process, from the counters it publishes in its ring header."""
+    path: Path
+    seed: int
+    frames: int
+    samplerate: int
+    elapsed: float
+    busy: float     # seconds spent rendering
+    waiting: float  # seconds blocked on a full ring (the parent is behind)
+    failed: bool = False
+
+    @property
+    def realtime_factor(self) -> float:
+        return self.frames / self.samplerate / self.elapsed if self.elapsed > 0 else float("inf")
+
+    @property
+    def render_factor(self) -> float:
+        """Realtime factor counting only the time spent rendering."""
+        return self.frames / self.samplerate / self.busy if self.busy > 0 else float("inf")
+
+def render_stream(ring_name: str, capacity: int, job: StreamJob, sample_dir: str, drum_dir: str,
+                  samplerate: int, blocksize: int, chord_cache_mb: float, routes=None):
+    """Worker process: run a full engine for `job` and push its output into the shared ring."""
+    from src.nonomi.audio.manager import AudioManager
+    from src.nonomi.audio.sampler import AudioSampler
+    from src.nonomi.input.source import open_input
+
+    ring = SharedAudioRing(capacity, name=ring_name)
+    header = ring.header
+    try:
+        # Warm sample caches are memory-mapped, so workers share those pages instead of holding copies
+        sampler = AudioSampler(sample_dir=sample_dir, drum_dir=drum_dir)
+        asyncio.run(sampler.start())
+        manager = AudioManager(
+            sampler=sampler, samplerate=samplerate, blocksize=blocksize, seed=job.seed,
+            chord_cache_mb=chord_cache_mb, routes=routes,
+        )
+        manager.reset_clock()
+
+        # Same control schedule as OfflineRenderer, so a stream matches a single-process render
+        source = open_input(job.input_spec) if job.input_spec else None
+        control_frames = int(0.1 * samplerate)
+        next_control = 0
+
+        total = int(job.seconds * samplerate)
+        done = 0
+        while done < total:
+            frames = min(blocksize, total - done)
+            start = time.perf_counter_ns()
+            if source is not None and done >= next_control:
+                follow_input(manager, source, done / samplerate)
+                next_control += control_frames
+
+            manager.fill_patterns()
+            block = manager.render_block(frames)
+            np.clip(block, -1.0, 1.0, out=block)
+            header[ring.BUSY_NS] += time.perf_counter_ns() - start
+
+            # Backpressure: wait for the parent to drain instead of growing anything
+            written = ring.write(block)
+            while written < frames:
+                start = time.perf_counter_ns()
+                time.sleep(0.002)
+                header[ring.WAIT_NS] += time.perf_counter_ns() - start
+                written += ring.write(block[written:])
+
+            done += frames
+            header[ring.FRAMES] = done
+
+    except BaseException:
+        header[ring.FAILED] = 1
+        raise
+    finally:
+        header[ring.DONE] = 1
+        del header
+        ring.close()
+
+class RenderFarm:
+    """Renders independent streams in parallel worker processes, one engine per process.
+
+    Every worker gets a SharedAudioRing; the parent writes straight from the ring views to the
+    output files, so PCM is never pickled or copied through a pipe. At most `workers` streams
+    run at once, the rest wait their turn.
+    """
+    def __init__(self, workers: int | None = None, sample_dir: str = "src/samples/PianoSamples",
+                 drum_dir: str = "src/samples/DrumSamples", samplerate: int = 44100, blocksize: int = 512,
+                 ring_seconds: float = 2.0, chord_cache_mb: float = 0.0, subtype: str | None = None, routes=None):
+        self.workers = workers or multiprocessing.cpu_count()
+        self.sample_dir = sample_dir
+        self.drum_dir = drum_dir
+        self.samplerate = samplerate
+        self.blocksize = blocksize
+        self.ring_frames = int(ring_seconds * samplerate)
+        self.chord_cache_mb = chord_cache_mb
+        self.routes = routes
+        self.subtype = subtype
+
+    def _launch(self, ctx, job: StreamJob) -> dict:
+        ring = SharedAudioRing(self.ring_frames)
+        process = ctx.Process(
+            target=render_stream,
+            args=(ring.name, self.ring_frames, job, self.sample_dir, self.drum_dir,
+                  self.samplerate, self.blocksize, self.chord_cache_mb, self.routes),
+            name=f"render-{Path(job.path).stem}",
+        )
+        process.start()
+        out = sf.SoundFile(str(job.path), mode="w", samplerate=self.samplerate, channels=2, subtype=self.subtype)
+        return {"job": job, "ring": ring, "process": process, "file": out, "started": time.perf_counter()}
+
+    def _drain(self, run: dict) -> int:
+        ring = run["ring"]
+        views = ring.readable()
+        frames = 0
+        for view in views:
+            run["file"].write(view)
+            frames += len(view)
+        ring.consume(frames)
+        return frames
+
+    def _finish(self, run: dict) -> WorkerStats:
+        ring, job = run["ring"], run["job"]
+        run["process"].join()
+        run["file"].close()
+        header = ring.header
+
+        stats = WorkerStats(
+            path=Path(job.path),
+            seed=job.seed,
+            frames=int(header[ring.FRAMES]),
+            samplerate=self.samplerate,
+            elapsed=time.perf_counter() - run["started"],
+            busy=header[ring.BUSY_NS] / 1e9,
+            waiting=header[ring.WAIT_NS] / 1e9,
+            failed=bool(header[ring.FAILED]) or run["process"].exitcode != 0,
+        )
+        del header
+        ring.close(unlink=True)
+        return stats
+
+    def render(self, jobs: list[StreamJob]) -> list[WorkerStats]:
+        """Render every job, returns worker stats in job order."""
+        # spawn, not fork: the parent may be holding asyncio / executor threads
+        ctx = multiprocessing.get_context("spawn")
+        pending = list(enumerate(jobs))
+        running: dict[int, dict] = {}
+        results: dict[int, WorkerStats] = {}
+
+        while pending or running:
+            while pending and len(running) < self.workers:
+                idx, job = pending.pop(0)
+                running[idx] = self._launch(ctx, job)
+
+            progressed = 0
+            for idx, run in list(running.items()):
+                # Read DONE before draining so nothing written just before it is missed
+                done = bool(run["ring"].header[SharedAudioRing.DONE])
+                progressed += self._drain(run)
+                if done or not run["process"].is_alive():
+                    self._drain(run)
+                    results[idx] = self._finish(running.pop(idx))
+
+            if not progressed:
+                time.sleep(0.005)
+
+        return [results[i] for i in range(len(jobs))]
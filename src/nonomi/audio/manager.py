@@ -1,48 +1,25 @@
 import threading
+import time
 from collections import deque
 
 import numpy as np
-import sounddevice as sd
 from rich.console import Console
-from dataclasses import dataclass
 
 from src.nonomi.audio.piano import AudioComposer
 from src.nonomi.audio.drums import Drums
+from src.nonomi.audio.bus import Bus
+from src.nonomi.audio.chords import ChordCache, STRUM_PATTERNS, VELOCITY_BUCKETS, VOICING_VARIANTS
+from src.nonomi.audio.cache import ENVELOPE_HOP
+from src.nonomi.audio.commands import CommandQueue
 from src.nonomi.audio.engine import PianoFX, MasterFX
+from src.nonomi.audio.metrics import CallbackMetrics
+from src.nonomi.audio.modulation import ModTarget, ModulationMatrix, Route
+from src.nonomi.audio.pattern import BUS_IDS, BUSES, Pattern
+from src.nonomi.audio.voices import VoicePool
+from src.nonomi.utils.ringbuffer import AudioRingBuffer
 
-@dataclass
-class PlayingNote:
-    """A scheduled piano note in the mix buffer."""
-    audio_data: np.ndarray
-    position: int = 0
-    velocity: float = 1.0
-    start_delay: int = 0
-
-    @property
-    def is_finished(self) -> bool:
-        return self.position >= len(self.audio_data) + self.start_delay
-
-    def get_chunk(self, size: int) -> np.ndarray:
-        chunk = np.zeros((size, 2), dtype=np.float32)
-        if self.position < self.start_delay:
-            silence = min(size, self.start_delay - self.position)
-            self.position += silence
-            if silence == size:
-                return chunk
-
-            audio_start = silence
-        else:
-            audio_start = 0
-
-        audio_pos   = self.position - self.start_delay
-        remaining   = len(self.audio_data) - audio_pos
-        copy_size   = min(size - audio_start, remaining)
-        if copy_size > 0:
-            chunk[audio_start:audio_start + copy_size] = (
-                    self.audio_data[audio_pos:audio_pos + copy_size] * self.velocity
-            )
-            self.position += copy_size
-        return chunk
+DRUMS  = BUS_IDS["drums"]
+MELODY = BUS_IDS["melody"]
 
 class SequencerClock:
     """Sample-accurate clock."""
@@ -89,7 +66,8 @@ class SequencerClock:
         return 0
 
     def advance(self, frames: int) -> list:
-        """Advance the clock by a given number of frames and return a list of events that occur during this time."""
+        """Advance the clock by a given number of frames and return `(step_in_bar, offset)` for every
+        sixteenth that starts during this time. Offsets include swing, so they can run past the block."""
         events = []
         sps    = self._sps
         start  = self._total_samples
@@ -103,65 +81,251 @@ class SequencerClock:
 
             raw_step    = step_sample // sps
             step_in_bar = raw_step % self.STEPS_PER_BAR
-            swing_delay = self._swing_offset(step_in_bar)
-
-            events.append(("drum_step",   offset + swing_delay))
-            if step_in_bar % 2 == 0:
-                events.append(("melody_step", offset + swing_delay))
-
-            if step_in_bar == 0:
-                events.append(("chord_change", offset))
+            events.append((step_in_bar, offset + self._swing_offset(step_in_bar)))
 
         self._total_samples += frames
         return events
 
 class AudioManager:
-    """Manages audio playback, sequencing, and mixing."""
-    def __init__(self, sampler, bpm: float = 156.0, samplerate: int = 44100, blocksize: int = 512):
+    """Manages audio playback, sequencing, and mixing.
+
+    Voices are routed to buses (piano, bass, melody, drums), each with its own voice pool,
+    gain and optional FX; the buses are summed into the master FX. `buses[name].output` holds
+    each bus's last block, which is how the offline renderer writes stems.
+
+    Control methods (tempo, regenerate, toggles) are meant to be called from one control thread;
+    they only queue a command that the audio thread applies at the next block. Brightness just
+    sets a smoothed target and is safe from anywhere.
+
+    The music itself is decided ahead of time: `fill_patterns` (control side, call it often) keeps
+    `lookahead_bars` bars queued as Patterns, every chord, note and hit already resolved to a
+    sample, velocity and offset. The callback only places their steps on the clock and triggers
+    voices. Regenerating or resetting drops the bars queued before it and rewinds the sequencing
+    state they used, so a reset right after construction renders the same as no reset.
+
+    Every random decision comes from generators spawned off `seed`, so the same seed (and the same
+    control calls at the same blocks) renders bit-identical audio. Without one a fresh seed is
+    drawn; it is kept in `self.seed` so a run can be reproduced.
+
+    With `chord_cache_mb` > 0 each chord uses one of a few fixed voicings, strummed from a few
+    fixed patterns at quantized velocities, and is played as one pre-rendered voice (cut at
+    CACHED_CHORD_SECONDS) from a ChordCache of that size. The bass stays a voice of its own on
+    the bass bus.
+
+    Inputs (brightness, hue, loudness, ... see `update_inputs`) reach the engine through a
+    ModulationMatrix, evaluated on the audio thread at the start of every block. Without `routes`
+    only brightness is routed, to the master LPF; see `modulation_targets` for what can be driven.
+    """
+    BASS_VOICES   = 8
+    MELODY_VOICES = 16
+    CHORD_VELOCITY = (0.3, 0.5)
+    CACHED_CHORD_SECONDS = 4.0
+    DEFAULT_ROUTES = (Route("brightness", "cutoff"),)
+
+    def __init__(self, sampler, bpm: float = 156.0, samplerate: int = 44100, blocksize: int = 512,
+                 max_voices: int = 64, steal: str = "oldest", tail_threshold_db: float | None = -70.0,
+                 seed: int | None = None, chord_cache_mb: float = 0.0, processed_samples=None, routes=None,
+                 lookahead_bars: int = 2):
         self.sampler    = sampler
         self.samplerate = samplerate
         self.blocksize  = blocksize
         self.console    = Console()
 
-        self.composer    = AudioComposer(progression_length=8)
-        self.drums       = Drums(sampler, samplerate=samplerate)
+        seeds     = np.random.SeedSequence(seed)
+        self.seed = seeds.entropy
+        composer_seed, plan_seed, drum_seed, note_seed, strum_seed = seeds.spawn(5)
+        self.rng  = np.random.default_rng(note_seed)
+
+        self.composer    = AudioComposer(
+            progression_length=8,
+            rng=np.random.default_rng(composer_seed),
+            plan_rng=np.random.default_rng(plan_seed),
+        )
+        self.drums       = Drums(sampler, samplerate=samplerate, max_block=blocksize, rng=np.random.default_rng(drum_seed))
         self.master_fx   = MasterFX(samplerate=samplerate)
         self.clock       = SequencerClock(bpm=bpm, samplerate=samplerate)
 
+        # Pass `processed_samples` to share one preprocessed set between managers on the same sampler
         self.piano_fx = PianoFX(samplerate=samplerate)
-        self._processed_samples: dict[str, np.ndarray] = {}
-
-        for name, sample in sampler.samples.items():
-            raw = sample["data"]
-            if raw.ndim == 1:
-                raw = np.column_stack([raw, raw])
-            self._processed_samples[name] = self.piano_fx.process(raw)
+        if processed_samples is None:
+            processed_samples = sampler.preprocess(self.piano_fx)
+        self._processed_samples: dict[str, np.ndarray] = processed_samples
+
+        tail_threshold = None if tail_threshold_db is None else 10 ** (tail_threshold_db / 20)
+
+        def pool(voices: int) -> VoicePool:
+            return VoicePool(
+                max_voices=voices,
+                max_block=blocksize,
+                steal=steal,
+                fade_samples=int(0.005 * samplerate),
+                tail_threshold=tail_threshold,
+                min_tail=int(0.1 * samplerate),
+                hop=ENVELOPE_HOP,
+            )
 
-        self.playing_notes: list[PlayingNote] = []
-        self._lock   = threading.Lock()
-        self._stream: sd.OutputStream | None = None
+        # Chords get the main voice budget, bass and melody are monophonic-ish lines
+        self.voices = pool(max_voices)
+        self.buses: dict[str, Bus] = {
+            name: Bus(name, source, samplerate=samplerate, max_block=blocksize)
+            for name, source in (
+                ("piano",  self.voices),
+                ("bass",   pool(self.BASS_VOICES)),
+                ("melody", pool(self.MELODY_VOICES)),
+                ("drums",  self.drums),
+            )
+        }
+        self.chord_cache = ChordCache(
+            chord_cache_mb, max_frames=int(self.CACHED_CHORD_SECONDS * samplerate), fade_frames=int(0.25 * samplerate),
+        ) if chord_cache_mb > 0 else None
+        if self.chord_cache is not None:
+            # Fixed strum offsets (samples) and per-note velocity scales, one row per pattern
+            strum_rng = np.random.default_rng(strum_seed)
+            gaps = strum_rng.uniform(0.02, 0.05, (STRUM_PATTERNS, 7))
+            gaps[:, 0] = 0.0
+            self._strums = (np.cumsum(gaps, axis=1) * samplerate).astype(np.int64)
+            self._strum_velocity = strum_rng.uniform(0.9, 1.1, (STRUM_PATTERNS, 7))
+            self._voicing_seed = int(strum_rng.integers(2**32))
+            self._voicings: dict[tuple[int, int], list[int]] = {}
+
+        self._bus   = np.zeros((blocksize, 2), dtype=np.float32)
+        self.commands = CommandQueue()
+        self.patterns = CommandQueue(capacity=4 * lookahead_bars)
+        self.lookahead_bars = lookahead_bars
+        self.metrics  = CallbackMetrics(samplerate=samplerate)
+        self.modulation = ModulationMatrix(
+            self.modulation_targets(), samplerate=samplerate,
+            routes=self.DEFAULT_ROUTES if routes is None else routes,
+        )
+        self._stream = None
         self._running = False
 
+        # Control side of the lookahead: bars are made under the lock, counted in and out
+        self._control_lock = threading.Lock()
+        self._epoch = 0        # bumped by every restart (regenerate / reset)
+        self._next_bar = 0
+        self._generated = 0    # written by the control side only
+        self._consumed = 0     # written by the audio thread only
+        self._epoch_start = 0  # queue index of the current epoch's first queued bar
+        self._snapshots: deque[tuple[int, tuple]] = deque()  # (queue index, state before that bar)
+        self._cued_state: tuple | None = None  # state before the bar sent with the last restart
+
+        # Audio side
+        self._sources = [self.buses[name].source for name in BUSES[:-1]] + [self.drums.voices]
+        self._pattern: Pattern | None = None
+        self._cued: Pattern | None = None  # first bar after a restart, handed over with the command
+        self._playing_epoch = 0
+        self._melody_muted = False
+
+        self.composer.on_key_change = self._prepare_key
         self.composer.generate_progression()
-
-        self.viz_buffer: deque[np.ndarray] = deque(maxlen=5)
-
-    def _trigger_chord(self):
-        """Play the current chord's bass and notes with a strum effect."""
-        notes = self.composer.get_chord_notes(octave=3)
+        self._prepare_key(self.composer.current_key).result()
+        self.fill_patterns()
+
+        # Last second of output for the visualizer and any other tap (meters, recording)
+        self.viz_buffer = AudioRingBuffer(capacity=samplerate)
+
+    def modulation_targets(self) -> dict[str, ModTarget]:
+        """Everything the modulation matrix can drive. Setters run on the audio thread."""
+        # Piano samples are widened once when preprocessed, live width is relative to that
+        baked = 1.0 + self.piano_fx.widener_amount
+
+        def widen(amount: float):
+            for name in ("piano", "bass", "melody"):
+                self.buses[name].width = (1.0 + amount) / baked
+
+        return {
+            "tempo":          ModTarget(60.0, 180.0, self.clock.set_bpm, min_delta=0.5),
+            "drum_vol":       ModTarget(0.0, 0.5, lambda v: setattr(self.drums, "drum_vol", v)),
+            "widener":        ModTarget(0.0, 1.5, widen),
+            "melody_density": ModTarget(0.0, 0.2, lambda v: setattr(self.composer, "melody_density", v)),
+            "cutoff":         ModTarget(200.0, 15000.0, self.master_fx.cutoff.set_target),
+        }
+
+    def _prepare_key(self, key: str):
+        """Get the new key's notes ready (pitch-shifted / lazily loaded) before the callback asks for them."""
+        return self.sampler.prepare(self.composer.key_notes(key), self._processed_samples)
+
+    def _sequence_bar(self) -> Pattern:
+        """Control thread: make every decision for the next bar, in the order the steps play."""
+        pattern = Pattern(self._epoch, self._next_bar, SequencerClock.STEPS_PER_BAR)
+        for step in range(SequencerClock.STEPS_PER_BAR):
+            for data, velocity in self.drums.sequence_step():
+                pattern.add(step, "drums", data, velocity=velocity)
+
+            if step % 2 == 0:
+                self._sequence_melody(pattern, step)
+
+            if step == 0:
+                self._sequence_chord(pattern, step)
+                self._advance_chord()
+
+        self._next_bar += 1
+        return pattern
+
+    def _sequence_chord(self, pattern: Pattern, step: int):
+        """The current chord's bass and notes with a strum effect."""
+        notes = self.composer.get_chord_notes(octave=3, voicing=self._cached_voicing())
         bass  = self.composer.get_bass_note(octave=2)
 
-        self._schedule_note(bass, velocity_range=(0.5, 0.7), delay_sec=0.0)
+        self._schedule_note(pattern, step, bass, velocity_range=(0.5, 0.7), delay_sec=0.0, bus="bass")
+
+        if self.chord_cache is not None:
+            self._sequence_cached_chord(pattern, step, notes)
+            return
 
         strum = 0.0
         for note in notes:
-            self._schedule_note(note, velocity_range=(0.3, 0.5), delay_sec=strum)
-            strum += np.random.uniform(0.02, 0.05)
+            self._schedule_note(pattern, step, note, velocity_range=self.CHORD_VELOCITY, delay_sec=strum, bus="piano")
+            strum += self.rng.uniform(0.02, 0.05)
+
+    def _cached_voicing(self) -> list[int] | None:
+        """With the chord cache on, one of VOICING_VARIANTS fixed voicings per chord, so chords repeat."""
+        if self.chord_cache is None:
+            return None
+
+        chord = self.composer.current_chord
+        key = (chord.degree, int(self.rng.integers(VOICING_VARIANTS)))
+        voicing = self._voicings.get(key)
+        if voicing is None:
+            rng = np.random.default_rng([self._voicing_seed, *key])
+            voicing = self._voicings[key] = chord.generate_voicing(self.composer.voicing_size, rng)
+        return voicing
+
+    def _sequence_cached_chord(self, pattern: Pattern, step: int, notes: list[str]):
+        """The voicing as one cached voice, or as separate voices while it gets rendered."""
+        bucket  = int(self.rng.integers(VELOCITY_BUCKETS))
+        strum   = int(self.rng.integers(STRUM_PATTERNS))
+        key = (tuple(notes), bucket, strum)
+
+        entry = self.chord_cache.get(key)
+        if entry is not None:
+            data, envelope = entry
+            pattern.add(step, "piano", data, envelope)
+            return
 
-    def _trigger_melody(self):
+        low, high = self.CHORD_VELOCITY
+        base = low + (bucket + 0.5) * (high - low) / VELOCITY_BUCKETS
+        parts = []
+        for i, note in enumerate(notes):
+            velocity = base * self._strum_velocity[strum, i]
+            delay = int(self._strums[strum, i])
+            found = self._lookup(note, velocity)
+            if found is None:
+                continue
+
+            processed, envelope = found
+            pattern.add(step, "piano", processed, envelope, velocity=velocity, delay=delay)
+            parts.append((processed, velocity, delay))
+
+        # Don't cache a chord with a note missing
+        if len(parts) == len(notes):
+            self.chord_cache.render(key, parts)
+
+    def _sequence_melody(self, pattern: Pattern, step: int):
         note = self.composer.get_melody_note()
         if note:
-            self._schedule_note(note, velocity_range=(0.25, 0.40), delay_sec=0.0)
+            self._schedule_note(pattern, step, note, velocity_range=(0.25, 0.40), delay_sec=0.0, bus="melody")
 
     def _advance_chord(self):
         changes = self.composer.advance_chord()
@@ -169,60 +333,125 @@ class AudioManager:
         if changes.get("randomize_drums"):
             self.drums.randomize_mutes()
 
-        if "melody_density" in changes:
+        # A routed density belongs to the modulation matrix, not the per-cycle roll
+        if "melody_density" in changes and not self.modulation.drives("melody_density"):
             self.composer.melody_density = changes["melody_density"]
 
         if "melody_off" in changes:
             self.composer.melody_off = changes["melody_off"]
 
-    def _schedule_note(self, note_name: str, velocity_range: tuple, delay_sec: float):
-        processed = self._processed_samples.get(note_name)
-        if processed is None:
-            self.console.print(f"Note {note_name} not found :/", style="yellow")
+    def _schedule_note(self, pattern: Pattern, step: int, note_name: str, velocity_range: tuple,
+                       delay_sec: float, bus: str = "piano"):
+        """Add a note on `bus` at `step`, `delay_sec` after it (strum)."""
+        velocity = self.rng.uniform(*velocity_range)
+        found    = self._lookup(note_name, velocity)
+        if found is None:
             return
-        self.playing_notes.append(PlayingNote(
-            audio_data=processed,
-            velocity=np.random.uniform(*velocity_range),
-            start_delay=int(delay_sec * self.samplerate),
-        ))
-
-    def _audio_callback(self, outdata, frames, time_info, status):
-        if status:
-            #self.console.log(f"[Audio] {status}", style="yellow")
-            pass
 
-        bus = np.zeros((frames, 2), dtype=np.float32)
+        processed, envelope = found
+        pattern.add(step, bus, processed, envelope, velocity=velocity, delay=int(delay_sec * self.samplerate))
 
-        with self._lock:
-            events = self.clock.advance(frames)
+    def _lookup(self, note_name: str, velocity: float) -> tuple[np.ndarray, np.ndarray | None] | None:
+        """Processed sample and level envelope to play `note_name` at `velocity`."""
+        sample    = self.sampler.pick(note_name, velocity)
+        processed = self._processed_samples.get(sample) if sample else None
+        if processed is None:
+            self.console.print(f"Note {note_name} not found :/", style="yellow")
+            return None
+        return processed, self.sampler.envelopes.get(sample)
+
+    def _apply_commands(self):
+        """Drain the control queue, runs on the audio thread at the start of every block."""
+        while (item := self.commands.pop()) is not None:
+            command, value = item
+            if command == "tempo":
+                self.clock.set_bpm(value)
+
+            elif command == "restart":
+                # The new epoch's first bar rides along, so it can't go missing before its queue is filled
+                self.clock.reset()
+                self._playing_epoch = value.epoch
+                self._cued = value
+                self._pattern = None
+
+            elif command == "toggle_drums":
+                self.drums.toggle_drums()
+
+            elif command == "toggle_melody":
+                self._melody_muted = not self._melody_muted
+
+    def _next_pattern(self):
+        """Audio thread: take the next bar off the queue, skipping any made before the last restart."""
+        if self._cued is not None:
+            self._pattern, self._cued = self._cued, None
+            return
 
-            for (etype, offset, *_) in events:
-                if etype == "drum_step":
-                    self.drums.advance_step()
+        while (item := self.patterns.pop()) is not None:
+            self._consumed += 1
+            pattern = item[1]
+            if pattern.epoch >= self._playing_epoch:
+                self._pattern = pattern
+                return
+
+        # The control side fell behind, this bar stays silent rather than being made up here
+        self._pattern = None
+        self.metrics.missed_bars += 1
+
+    def render_block(self, frames: int) -> np.ndarray:
+        """Sequence and mix one block of audio, returns the master output."""
+        if frames > len(self._bus):
+            self._bus = np.zeros((frames, 2), dtype=np.float32)
+
+        bus = self._bus[:frames]
+        bus.fill(0.0)
+
+        self._apply_commands()
+        self.modulation.process(frames)
+
+        drums_on = self.drums.enable_drums
+        melody_on = not self._melody_muted
+        for step, offset in self.clock.advance(frames):
+            if step == 0:
+                self._next_pattern()
+            pattern = self._pattern
+            if pattern is None:
+                continue
+
+            # Offsets can run past the block end (swing, strum), the voice pool carries the delay over
+            samples = pattern.samples
+            for delay, bus_id, sample_id, velocity in pattern.steps[step]:
+                if (bus_id == DRUMS and not drums_on) or (bus_id == MELODY and not melody_on):
+                    continue
+                data, envelope = samples[sample_id]
+                self._sources[bus_id].trigger(data, velocity=velocity, delay=offset + delay, envelope=envelope)
+
+        for channel in self.buses.values():
+            bus += channel.render(frames)
+
+        return self.master_fx.process(bus)
 
-                elif etype == "melody_step":
-                    self._trigger_melody()
+    def _audio_callback(self, outdata, frames, time_info, status):
+        start = time.perf_counter()
 
-                elif etype == "chord_change":
-                    self._trigger_chord()
-                    self._advance_chord()
+        processed = self.render_block(frames)
+        np.clip(processed, -1.0, 1.0, out=outdata)
+        self.viz_buffer.write(outdata)
 
-            finished = []
-            for i, note in enumerate(self.playing_notes):
-                bus[:frames] += note.get_chunk(frames)
-                if note.is_finished:
-                    finished.append(i)
+        # No logging in here, status and timings are only counted and read from other threads
+        self.metrics.record(time.perf_counter() - start, frames, status, self.voice_count(), len(self.drums.voices))
 
-            for i in reversed(finished):
-                self.playing_notes.pop(i)
+    def voice_count(self) -> int:
+        """Live piano voices across the piano, bass and melody buses."""
+        buses = self.buses
+        return len(buses["piano"].source) + len(buses["bass"].source) + len(buses["melody"].source)
 
-            bus += self.drums.get_active_hits(frames)
+    def start(self):
+        # Imported here so headless render boxes without PortAudio can still render offline
+        import sounddevice as sd
 
-        processed = self.master_fx.process(bus)
-        self.viz_buffer.append(processed.copy())
-        outdata[:] = np.clip(processed, -1.0, 1.0)
+        if self.chord_cache is not None:
+            self.chord_cache.start_background()
 
-    def start(self):
         self._stream = sd.OutputStream(
             samplerate=self.samplerate,
             blocksize=self.blocksize,
@@ -237,27 +466,109 @@ class AudioManager:
             self._stream.stop()
             self._stream.close()
 
-    def reset_clock(self):
-        with self._lock:
-            self.clock.reset()
-            self.drums.reset_step()
+    def fill_patterns(self) -> int:
+        """Control side: queue bars until `lookahead_bars` are waiting, returns how many were made.
+        Call it regularly from one control thread, or between blocks when rendering."""
+        made = 0
+        with self._control_lock:
+            # Bars queued before the last restart are still in the ring but will be skipped
+            while self._generated - max(self._consumed, self._epoch_start) < self.lookahead_bars and self._queue_bar():
+                made += 1
+        return made
+
+    def _queue_bar(self) -> bool:
+        if len(self.patterns) >= self.patterns.capacity - 1:
+            return False
+
+        consumed = self._consumed
+        while self._snapshots and self._snapshots[0][0] < consumed:
+            self._snapshots.popleft()
+        self._snapshots.append((self._generated, self._sequence_state()))
+
+        self.patterns.push("bar", self._sequence_bar())
+        self._generated += 1
+        return True
+
+    def _sequence_state(self) -> tuple:
+        """Everything sequencing a bar moves on, so bars that get dropped can be taken back."""
+        composer, drums = self.composer, self.drums
+        return (
+            composer.progress, composer.scale_pos, composer.melody_density, composer.melody_off,
+            drums.current_step, drums.kick_off, drums.snare_off, drums.hat_off,
+            composer.rng.bit_generator.state, drums.rng.bit_generator.state, self.rng.bit_generator.state,
+        )
 
-    def regenerate(self):
-        """JS: generateProgression button — pick new key + progression."""
-        with self._lock:
-            self.composer.generate_progression()
-            self.clock.reset()
+    def _restore_state(self, state: tuple):
+        composer, drums = self.composer, self.drums
+        density = composer.melody_density
+        (composer.progress, composer.scale_pos, composer.melody_density, composer.melody_off,
+         drums.current_step, drums.kick_off, drums.snare_off, drums.hat_off,
+         composer.rng.bit_generator.state, drums.rng.bit_generator.state, self.rng.bit_generator.state) = state
+        if self.modulation.drives("melody_density"):
+            composer.melody_density = density
+
+    def _restart(self, plan: dict | None = None) -> bool:
+        """Start over from bar 0 (with a new progression if given). Bars still queued are dropped and
+        everything they moved on is rewound, so a reset right after construction changes nothing."""
+        with self._control_lock:
+            if len(self.commands) >= self.commands.capacity - 1:
+                return False
+
+            # Rewind to before the oldest bar that hasn't started, the last cued one if it hasn't been taken yet
+            consumed = self._consumed
+            while self._snapshots and self._snapshots[0][0] < consumed:
+                self._snapshots.popleft()
+            if self._playing_epoch < self._epoch:
+                self._restore_state(self._cued_state)
+            elif self._snapshots:
+                self._restore_state(self._snapshots[0][1])
+            self._snapshots.clear()
+
+            self._epoch += 1
+            self._next_bar = 0
+            if plan is not None:
+                self.composer.apply_progression(plan)
             self.drums.reset_step()
 
-    def set_tempo(self, bpm: float):
-        with self._lock:
-            self.clock.set_bpm(bpm)
+            self._cued_state = self._sequence_state()
+            self.commands.push("restart", self._sequence_bar())
+            self._epoch_start = self._generated
+            for _ in range(self.lookahead_bars - 1):
+                self._queue_bar()
+            return True
+
+    def reset_clock(self) -> bool:
+        return self._restart()
+
+    def regenerate(self) -> bool:
+        """JS: generateProgression button — pick new key + progression.
+        Blocks until the new key's samples are ready, so call it via asyncio.to_thread from the event loop."""
+        plan = self.composer.plan_progression()
+        if plan.get("prepared") is not None:
+            plan["prepared"].result()
+        return self._restart(plan)
+
+    def set_tempo(self, bpm: float) -> bool:
+        return self.commands.push("tempo", bpm)
 
     def update_brightness(self, brightness: float):
-        self.master_fx.update_filter(brightness)
+        # Only sets an input, the matrix applies it on the audio thread
+        self.modulation.set_input("brightness", brightness)
+
+    def update_inputs(self, values: dict[str, float]):
+        """Set modulation inputs by name (0..1), e.g. an InputSource's `features()`. Safe from any thread."""
+        self.modulation.set_inputs(values)
+
+    def toggle_drums(self) -> bool:
+        return self.commands.push("toggle_drums")
+
+    def toggle_melody(self) -> bool:
+        return self.commands.push("toggle_melody")
 
-    def toggle_drums(self):
-        self.drums.toggle_drums()
+    def set_bus_gain(self, name: str, gain: float):
+        # A single float store, the audio thread picks it up at its next block
+        self.buses[name].gain = gain
 
-    def toggle_melody(self):
-        self.composer.melody_off = not self.composer.melody_off
+    def set_bus_fx(self, name: str, fx):
+        """Swap a bus's FX (a Pedalboard, or None). Plugins keep state, so set this before starting."""
+        self.buses[name].fx = fx
@@ -0,0 +1,100 @@
+import numpy as np
+
+class CallbackMetrics:
+    """Low-overhead counters for the audio callback.
+
+    `record` runs on the audio thread and only does arithmetic on preallocated storage,
+    no logging or I/O. Everything else (snapshot, percentiles, summary) is for other threads
+    and may see values from slightly different blocks.
+    """
+    def __init__(self, samplerate: int, bins: int = 100, max_load: float = 2.0, smoothing: float = 0.95):
+        self.samplerate = samplerate
+        self.max_load = max_load
+        self.bin_width = max_load / bins
+        self.smoothing = smoothing
+
+        # Callback duration as a fraction of its deadline, last bin catches everything above max_load
+        self.histogram = np.zeros(bins, dtype=np.int64)
+        self.callbacks   = 0
+        self.xruns       = 0  # output underflows and overflows
+        self.underflows  = 0
+        self.input_xruns = 0
+        self.load        = 0.0
+        self.peak_load   = 0.0
+        self.voices      = 0
+        self.drum_voices = 0
+        self.peak_voices = 0
+        self.missed_bars = 0  # bars the lookahead hadn't queued in time, counted by the manager
+
+    def record(self, elapsed: float, frames: int, status, voices: int, drum_voices: int):
+        """Audio thread: account for one callback that took `elapsed` seconds."""
+        load = elapsed * self.samplerate / frames
+        bin_idx = int(load / self.bin_width)
+        if bin_idx >= len(self.histogram):
+            bin_idx = len(self.histogram) - 1
+        self.histogram[bin_idx] += 1
+
+        self.callbacks += 1
+        self.load = self.load * self.smoothing + load * (1.0 - self.smoothing)
+        if load > self.peak_load:
+            self.peak_load = load
+
+        # Other flags (priming_output on start) aren't dropouts
+        if status:
+            if status.output_underflow or status.output_overflow:
+                self.xruns += 1
+            if status.output_underflow:
+                self.underflows += 1
+            if status.input_underflow or status.input_overflow:
+                self.input_xruns += 1
+
+        self.voices = voices
+        self.drum_voices = drum_voices
+        if voices + drum_voices > self.peak_voices:
+            self.peak_voices = voices + drum_voices
+
+    def percentile(self, q: float) -> float:
+        """Approximate load percentile (0..1 of the deadline) from the histogram."""
+        counts = self.histogram.copy()
+        total = counts.sum()
+        if total == 0:
+            return 0.0
+
+        idx = int(np.searchsorted(np.cumsum(counts), q / 100.0 * total))
+        return (idx + 1) * self.bin_width
+
+    @property
+    def dsp_load(self) -> float:
+        """Smoothed DSP load in percent of the real-time deadline."""
+        return self.load * 100.0
+
+    def snapshot(self) -> dict:
+        return {
+            "callbacks": self.callbacks,
+            "xruns": self.xruns,
+            "underflows": self.underflows,
+            "input_xruns": self.input_xruns,
+            "dsp_load": self.dsp_load,
+            "peak_load": self.peak_load * 100.0,
+            "p99_load": self.percentile(99) * 100.0,
+            "voices": self.voices,
+            "drum_voices": self.drum_voices,
+            "peak_voices": self.peak_voices,
+            "missed_bars": self.missed_bars,
+        }
+
+    def summary(self) -> str:
+        snap = self.snapshot()
+        return (
+            f"DSP {snap['dsp_load']:.0f}% (p99 {snap['p99_load']:.0f}%, peak {snap['peak_load']:.0f}%)"
+            f" | voices {snap['voices']}+{snap['drum_voices']} (peak {snap['peak_voices']})"
+            f" | xruns {snap['xruns']} (underflows {snap['underflows']})"
+            + (f" | input xruns {snap['input_xruns']}" if snap["input_xruns"] else "")
+            + (f" | missed bars {snap['missed_bars']}" if snap["missed_bars"] else "")
+        )
+
+    def reset(self):
+        self.histogram[:] = 0
+        self.callbacks = self.xruns = self.underflows = self.input_xruns = 0
+        self.load = self.peak_load = 0.0
+        self.peak_voices = self.missed_bars = 0
@@ -0,0 +1,224 @@
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+
+CURVE_POINTS = 129
+_x = np.linspace(0.0, 1.0, CURVE_POINTS)
+CURVES: dict[str, np.ndarray] = {
+    "linear": _x,
+    "invert": 1.0 - _x,
+    "exp":    np.expm1(4.0 * _x) / np.expm1(4.0),           # slow start, for cutoffs and levels
+    "log":    np.log1p(np.expm1(4.0) * _x) / 4.0,           # the inverse of exp
+    "smooth": _x * _x * (3.0 - 2.0 * _x),                   # smoothstep, eases both ends
+}
+CURVE_NAMES = tuple(CURVES)
+_CURVE_TABLE = np.concatenate([CURVES[name] for name in CURVE_NAMES])  # flat, one row per curve
+
+@dataclass(frozen=True)
+class ModTarget:
+    """An engine parameter the matrix can drive. Routes sum to 0..1, which maps onto `low..high`;
+    `apply` is called on the audio thread, only once the value has moved more than `min_delta`."""
+    low: float
+    high: float
+    apply: Callable[[float], None]
+    min_delta: float = 0.0
+
+@dataclass(frozen=True)
+class Route:
+    """`amount * curve(source)` added to `target`, glided over `smoothing` seconds."""
+    source: str
+    target: str
+    curve: str = "linear"
+    amount: float = 1.0
+    smoothing: float = 0.0
+
+def parse_route(spec: str) -> Route:
+    """`SOURCE:TARGET[:CURVE[:AMOUNT[:SECONDS]]]`, e.g. `hue:tempo:smooth:1:4`."""
+    parts = spec.split(":")
+    if len(parts) < 2 or len(parts) > 5:
+        raise ValueError(f"Bad route '{spec}', expected SOURCE:TARGET[:CURVE[:AMOUNT[:SECONDS]]]")
+
+    source, target, *rest = parts
+    curve = rest[0] if rest and rest[0] else "linear"
+    if curve not in CURVES:
+        raise ValueError(f"Unknown curve '{curve}', pick from {', '.join(CURVE_NAMES)}")
+    amount = float(rest[1]) if len(rest) > 1 and rest[1] else 1.0
+    smoothing = float(rest[2]) if len(rest) > 2 and rest[2] else 0.0
+    return Route(source, target, curve, amount, smoothing)
+
+class _RouteTable:
+    """Routes flattened into arrays, with preallocated scratch so evaluating allocates next to nothing.
+    Built on the control thread and swapped in whole, the audio thread only ever reads it."""
+    def __init__(self, routes: list[Route], sources: list[int], targets: list[int], target_count: int):
+        count = len(routes)
+        self.source = np.array(sources, dtype=np.intp)
+        self.target = np.array(targets, dtype=np.intp)
+        self.curve_base = np.array([CURVE_NAMES.index(r.curve) * CURVE_POINTS for r in routes], dtype=np.intp)
+        self.amount = np.array([r.amount for r in routes], dtype=np.float64)
+        self.smoothing = np.array([r.smoothing for r in routes], dtype=np.float64)
+        self.driven = np.bincount(self.target, minlength=target_count) > 0
+
+        self.state = np.full(count, np.nan)
+        self.coeff = np.ones(count)
+        self.coeff_frames = 0
+        self.settled = False
+
+        self.x = np.zeros(count)
+        self.unset = np.zeros(count, dtype=bool)
+        self.index = np.zeros(count, dtype=np.intp)
+        self.frac = np.zeros(count)
+        self.shaped = np.zeros(count)
+        self.upper = np.zeros(count)
+
+class ModulationMatrix:
+    """Routes any input scalar (brightness, hue, loudness, ...) to any engine parameter.
+
+    Inputs are set from any thread (each is a single float store). Route edits rebuild the route
+    table on the calling thread and swap it in, so make them from one control thread. `process`
+    runs on the audio thread once per block: every route is shaped, scaled and smoothed in one
+    pass over flat arrays, summed per target, and only targets that actually moved are applied.
+    Nothing is evaluated while the inputs are unchanged and every glide has landed.
+    """
+    MAX_INPUTS = 32
+    SETTLE = 1e-4  # route outputs closer than this to where they're headed count as landed
+
+    def __init__(self, targets: dict[str, ModTarget], samplerate: int = 44100, routes=()):
+        self.samplerate = samplerate
+        self.targets = targets
+        self._target_index = {name: i for i, name in enumerate(targets)}
+        self._low = np.array([t.low for t in targets.values()], dtype=np.float64)
+        self._span = np.array([t.high - t.low for t in targets.values()], dtype=np.float64)
+        self._min_delta = np.array([t.min_delta for t in targets.values()], dtype=np.float64)
+        self._apply = [t.apply for t in targets.values()]
+        self._applied = np.full(len(targets), np.nan)
+        self._values = np.zeros(len(targets))
+
+        self._inputs = np.full(self.MAX_INPUTS, np.nan)  # NaN until set, its targets are left alone
+        self._input_index: dict[str, int] = {}
+        self._version = 0  # bumped on every input change
+        self._seen = -1    # version the audio thread last evaluated
+
+        self.routes: list[Route] = []
+        self._table: _RouteTable | None = None
+        self.set_routes(routes)
+
+    @property
+    def inputs(self) -> dict[str, float]:
+        """Inputs set so far."""
+        return {name: float(self._inputs[i]) for name, i in self._input_index.items() if not np.isnan(self._inputs[i])}
+
+    def _slot(self, name: str) -> int:
+        slot = self._input_index.get(name)
+        if slot is None:
+            if len(self._input_index) >= self.MAX_INPUTS:
+                raise ValueError(f"Too many modulation inputs, '{name}' doesn't fit")
+            slot = self._input_index[name] = len(self._input_index)
+        return slot
+
+    def set_input(self, name: str, value: float):
+        self._inputs[self._slot(name)] = min(1.0, max(0.0, float(value)))
+        self._version += 1
+
+    def set_inputs(self, values: dict[str, float]):
+        for name, value in values.items():
+            self._inputs[self._slot(name)] = min(1.0, max(0.0, float(value)))
+        self._version += 1
+
+    def check_routes(self, routes):
+        """Raise ValueError for a route to an unknown target or with an unknown curve."""
+        for route in routes:
+            if route.target not in self._target_index:
+                raise ValueError(f"Unknown modulation target '{route.target}', pick from {', '.join(self.targets)}")
+            if route.curve not in CURVES:
+                raise ValueError(f"Unknown curve '{route.curve}', pick from {', '.join(CURVE_NAMES)}")
+
+    def set_routes(self, routes):
+        """Replace every route. Unknown targets or curves raise ValueError and leave the old routes."""
+        routes = list(routes)
+        self.check_routes(routes)
+
+        self._table = _RouteTable(
+            routes,
+            [self._slot(r.source) for r in routes],
+            [self._target_index[r.target] for r in routes],
+            len(self.targets),
+        ) if routes else None
+        self.routes = routes
+        self._applied.fill(np.nan)
+        self._seen = -1
+
+    def add_route(self, route: Route):
+        self.set_routes([*self.routes, route])
+
+    def remove_routes(self, source: str | None = None, target: str | None = None):
+        """Drop every route from `source` and/or to `target`. A target left undriven keeps its last value."""
+        self.set_routes([
+            r for r in self.routes
+            if not ((source is None or r.source == source) and (target is None or r.target == target))
+        ])
+
+    def drives(self, target: str) -> bool:
+        table = self._table
+        return table is not None and bool(table.driven[self._target_index[target]])
+
+    def process(self, frames: int):
+        """Audio thread: advance every route by one block of `frames` and apply the targets that moved."""
+        table = self._table
+        version = self._version
+        if table is None or (version == self._seen and table.settled):
+            return
+        self._seen = version
+
+        if frames != table.coeff_frames:
+            table.coeff_frames = frames
+            with np.errstate(divide="ignore"):
+                np.exp(-frames / (table.smoothing * self.samplerate), out=table.coeff)
+            np.subtract(1.0, table.coeff, out=table.coeff)
+
+        # Curve lookup with linear interpolation between table points, one gather for every route
+        np.take(self._inputs, table.source, out=table.x)
+        np.isnan(table.x, out=table.unset)
+        np.copyto(table.x, 0.0, where=table.unset)
+        table.x *= CURVE_POINTS - 1
+        np.floor(table.x, out=table.frac)
+        np.minimum(table.frac, CURVE_POINTS - 2, out=table.frac)
+        table.index[:] = table.frac
+        np.subtract(table.x, table.frac, out=table.frac)
+        table.index += table.curve_base
+
+        np.take(_CURVE_TABLE, table.index, out=table.shaped)
+        table.index += 1
+        np.take(_CURVE_TABLE, table.index, out=table.upper)
+        table.upper -= table.shaped
+        table.upper *= table.frac
+        table.shaped += table.upper
+        table.shaped *= table.amount
+        np.copyto(table.shaped, np.nan, where=table.unset)
+
+        # One-pole glide per route, a fresh table starts on its first value
+        state = table.state
+        np.copyto(state, table.shaped, where=np.isnan(state))
+        np.subtract(table.shaped, state, out=table.upper)
+        table.settled = not (np.abs(table.upper) >= self.SETTLE).any()
+        if table.settled:
+            state[:] = table.shaped
+        else:
+            table.upper *= table.coeff
+            state += table.upper
+
+        values = self._values
+        values[:] = np.bincount(table.target, weights=state, minlength=len(values))
+        np.clip(values, 0.0, 1.0, out=values)
+        values *= self._span
+        values += self._low
+
+        # Small steps wait until they add up, except the last one of a glide
+        delta = np.abs(values - self._applied)
+        first = np.isnan(self._applied) & ~np.isnan(values)
+        moved = table.driven & ((delta > self._min_delta) | first | (table.settled & (delta > 0)))
+        for i in np.flatnonzero(moved):
+            value = float(values[i])
+            self._applied[i] = value
+            self._apply[i](value)
+
@@ -0,0 +1,32 @@
+import numpy as np
+
+BUSES = ("piano", "bass", "melody", "drums")
+BUS_IDS = {name: i for i, name in enumerate(BUSES)}
+
+class Pattern:
+    """One bar of events, generated ahead of time on the control thread.
+
+    Every musical decision is already made: an event is `(delay, bus_id, sample_id, velocity)`,
+    triggered at its step plus `delay` samples, with `sample_id` indexing this bar's `samples`
+    table of (data, envelope) pairs. Steps are placed by the clock when the bar plays, so tempo
+    and swing still apply. Once queued a pattern is only read.
+    """
+    def __init__(self, epoch: int, bar: int, steps: int = 16):
+        self.epoch = epoch  # generation it belongs to, bumped by regenerate / reset
+        self.bar = bar
+        self.steps: list[list[tuple[int, int, int, float]]] = [[] for _ in range(steps)]
+        self.samples: list[tuple[np.ndarray, np.ndarray | None]] = []
+        self._ids: dict[int, int] = {}
+
+    def add(self, step: int, bus: str, data: np.ndarray, envelope: np.ndarray | None = None,
+            velocity: float = 1.0, delay: int = 0):
+        # Keyed by identity, the same processed array always gets the same id within a bar
+        sample_id = self._ids.get(id(data))
+        if sample_id is None:
+            sample_id = self._ids[id(data)] = len(self.samples)
+            self.samples.append((data, envelope))
+
+        self.steps[step].append((int(delay), BUS_IDS[bus], sample_id, float(velocity)))
+
+    def __len__(self) -> int:
+        return sum(len(events) for events in self.steps)
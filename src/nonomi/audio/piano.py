@@ -1,6 +1,7 @@
-import random
 from dataclasses import dataclass
-from typing import List, Optional, Any
+from typing import List, Optional, Any, Callable
+
+import numpy as np
 
 MAJOR_SCALE_SEMITONES = [0, 2, 4, 5, 7, 9, 11]
 NOTE_TO_SEMITONE: dict[str, int] = {
@@ -22,6 +23,11 @@ SEMITONE_TO_NOTE: dict[int, str] = {v: k for k, v in NOTE_TO_SEMITONE.items()}
 ALL_KEYS = list(NOTE_TO_SEMITONE.keys())
 FIVE_TO_FIVE = [-5, -3, -1, 0, 2, 4, 5, 7, 9, 11, 12, 14, 16, 17, 19]
 INTERVAL_WEIGHTS = [0.10, 0.30, 0.20, 0.15, 0.15, 0.025, 0.025, 0.05]
+MIN_OCTAVE, MAX_OCTAVE = 1, 7  # missing samples get pitch-shifted from the nearest one
+KEY_OCTAVES = range(2, MAX_OCTAVE + 1)  # bass at 2, chords from 3, melody from 5
+
+# Only for callers that don't pass a generator, everything the manager builds is seeded
+_default_rng = np.random.default_rng()
 
 def semitone_to_note_name(semitone: int) -> str:
     return SEMITONE_TO_NOTE[semitone % 12]
@@ -45,16 +51,18 @@ class Chord:
         """Calculate the semitone distance from the root note based on the chord's degree in the major scale."""
         return MAJOR_SCALE_SEMITONES[self.degree - 1]
 
-    def next_chord_idx(self) -> int:
-        return random.choice(self.next_chord_idxs)
+    def next_chord_idx(self, rng: Optional[np.random.Generator] = None) -> int:
+        rng = rng or _default_rng
+        return self.next_chord_idxs[rng.integers(len(self.next_chord_idxs))]
 
-    def generate_voicing(self, size: int) -> List[int]:
+    def generate_voicing(self, size: int, rng: Optional[np.random.Generator] = None) -> List[int]:
         """Generate a voicing for the chord by shuffling the intervals (except the root) and ensuring they are in ascending order."""
         if size < 3:
             return self.intervals[:3]
 
+        rng = rng or _default_rng
         voicing = list(self.intervals[1:size])
-        random.shuffle(voicing)
+        rng.shuffle(voicing)
         for i in range(1, len(voicing)):
             while voicing[i] < voicing[i - 1]:
                 voicing[i] += 12
@@ -78,22 +86,31 @@ ALL_CHORDS = [CHORD_I, CHORD_ii, CHORD_iii, CHORD_IV, CHORD_V, CHORD_vi, CHORD_v
 
 class ChordProgression:
     @staticmethod
-    def generate(length: int) -> Optional[List[Chord]]:
+    def generate(length: int, rng: Optional[np.random.Generator] = None) -> Optional[List[Chord]]:
         if length < 2:
             return None
+        rng = rng or _default_rng
         progression = []
-        chord = random.choice(ALL_CHORDS)
+        chord = ALL_CHORDS[rng.integers(len(ALL_CHORDS))]
 
         for _ in range(length):
             progression.append(Chord(chord.degree, list(chord.intervals), list(chord.next_chord_idxs)))
-            chord = ALL_CHORDS[chord.next_chord_idx()]
+            chord = ALL_CHORDS[chord.next_chord_idx(rng)]
 
         return progression
 
 class AudioComposer:
-    """Manages progression state."""
-    def __init__(self, progression_length: int = 8):
-        self.progression: List[Chord] = ChordProgression.generate(progression_length)
+    """Manages progression state.
+
+    `rng` drives everything decided bar by bar (voicings, melody, chord-change rolls), which the
+    manager does ahead of playback, and `plan_rng` the key/progression plans, which may be made
+    from another thread meanwhile; keeping them apart means neither touches the other's generator.
+    """
+    def __init__(self, progression_length: int = 8, rng: Optional[np.random.Generator] = None,
+                 plan_rng: Optional[np.random.Generator] = None):
+        self.rng = rng or np.random.default_rng()
+        self.plan_rng = plan_rng or np.random.default_rng()
+        self.progression: List[Chord] = ChordProgression.generate(progression_length, self.plan_rng)
         self.progress: int = 0
         self.current_key: str = "C"
         self.scale: List[int] = []
@@ -101,15 +118,45 @@ class AudioComposer:
         self.melody_density: float = 0.33
         self.melody_off: bool = False
         self.voicing_size: int = 4
+        self.on_key_change: Optional[Callable[[str], Any]] = None
 
     def generate_progression(self):
         """Randomly select a key and generate a new chord progression, resetting progress and melody parameters."""
-        self.current_key = random.choice(ALL_KEYS)
-        self.progression = ChordProgression.generate(8)
+        self.apply_progression(self.plan_progression())
+
+    def plan_progression(self) -> dict[str, Any]:
+        """Roll a new key and progression without touching the live state, so it can be done off the audio thread."""
+        rng = self.plan_rng
+        key = ALL_KEYS[rng.integers(len(ALL_KEYS))]
+        plan = {
+            "key": key,
+            "progression": ChordProgression.generate(8, rng),
+            "scale_pos": int(rng.integers(len(FIVE_TO_FIVE))),
+        }
+
+        if self.on_key_change:
+            plan["prepared"] = self.on_key_change(key)
+        return plan
+
+    def apply_progression(self, plan: dict[str, Any]):
+        self.current_key = plan["key"]
+        self.progression = plan["progression"]
         self.progress = 0
 
         self.scale = list(FIVE_TO_FIVE)
-        self.scale_pos = random.randint(0, len(self.scale) - 1)
+        self.scale_pos = plan["scale_pos"]
+
+    @staticmethod
+    def key_notes(key: str) -> List[str]:
+        """Every note name the composer can ask for in `key`: all chords and the melody stay diatonic."""
+        root = note_name_to_semitone(key)
+        names = []
+        for octave in KEY_OCTAVES:
+            for degree in MAJOR_SCALE_SEMITONES:
+                total = root + degree + octave * 12
+                names.append(f"{semitone_to_note_name(total)}{total // 12}")
+
+        return names
 
     @property
     def current_chord(self) -> Chord:
@@ -125,24 +172,26 @@ class AudioComposer:
 
         elif self.progress == 0:
             changes["randomize_drums"] = True
-            changes["melody_density"] = random.uniform(0.02, 0.05)
-            changes["melody_off"] = random.random() < 0.25
+            changes["melody_density"] = self.rng.uniform(0.02, 0.05)
+            changes["melody_off"] = self.rng.random() < 0.25
 
         self.progress = next_progress
         return changes
 
-    def get_chord_notes(self, octave: int = 3) -> List[str]:
-        """Calculate chord tones based on current key, chord intervals, and octave."""
+    def get_chord_notes(self, octave: int = 3, voicing: Optional[List[int]] = None) -> List[str]:
+        """Calculate chord tones based on current key, chord intervals, and octave.
+        A fresh voicing is rolled unless one is given."""
         root_semitone = note_name_to_semitone(self.current_key) + (octave * 12)
         root_semitone += self.current_chord.semitone_dist
-        voicing = self.current_chord.generate_voicing(self.voicing_size)
+        if voicing is None:
+            voicing = self.current_chord.generate_voicing(self.voicing_size, self.rng)
         notes = []
 
         for interval in voicing:
             total = root_semitone + interval
             note_name = semitone_to_note_name(total)
             final_octave = total // 12
-            if 1 <= final_octave <= 6:
+            if MIN_OCTAVE <= final_octave <= MAX_OCTAVE:
                 notes.append(f"{note_name}{final_octave}")
 
         return notes
@@ -160,7 +209,7 @@ class AudioComposer:
         if self.melody_off or not self.scale:
             return None
 
-        if random.random() >= self.melody_density:
+        if self.rng.random() >= self.melody_density:
             return None
 
         descend_range = min(self.scale_pos, 7)
@@ -170,7 +219,7 @@ class AudioComposer:
         can_ascend  = ascend_range >= 1
 
         if can_descend and can_ascend:
-            going_up = random.random() > 0.5
+            going_up = self.rng.random() > 0.5
 
         elif can_ascend:
             going_up = True
@@ -182,7 +231,7 @@ class AudioComposer:
             return None
 
         max_steps = ascend_range if going_up else descend_range
-        step_dist = self._weighted_step(max_steps)
+        step_dist = self._weighted_step(max_steps, self.rng)
 
         self.scale_pos += step_dist if going_up else -step_dist
         self.scale_pos = max(0, min(len(self.scale) - 1, self.scale_pos))
@@ -192,13 +241,13 @@ class AudioComposer:
         note_name = semitone_to_note_name(total)
 
         final_octave = total // 12
-        if 1 <= final_octave <= 6:
+        if MIN_OCTAVE <= final_octave <= MAX_OCTAVE:
             return f"{note_name}{final_octave}"
 
         return None
 
     @staticmethod
-    def _weighted_step(max_steps: int) -> int:
+    def _weighted_step(max_steps: int, rng: np.random.Generator) -> int:
         """Returns a random step distance from 1 to max_steps, weighted by INTERVAL_WEIGHTS."""
         available = INTERVAL_WEIGHTS[1: max_steps + 1]
         if not available:
@@ -206,7 +255,7 @@ class AudioComposer:
 
         total = sum(available)
         weights = [w / total for w in available]
-        roll = random.random()
+        roll = rng.random()
         cumulative = 0.0
 
         for i, w in enumerate(weights):
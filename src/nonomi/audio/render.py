@@ -0,0 +1,102 @@
+import time
+from contextlib import ExitStack
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+def stem_path(path, bus: str) -> Path:
+    """`mix.wav` -> `mix-drums.wav`"""
+    path = Path(path)
+    return path.with_name(f"{path.stem}-{bus}{path.suffix}")
+
+def follow_input(manager, source, seconds: float):
+    """Point the manager's modulation inputs at where `source` is `seconds` into its timeline."""
+    brightness, hue = source.values_at(seconds)
+    manager.update_inputs({**source.features(), "brightness": brightness, "hue": hue})
+
+@dataclass
+class RenderStats:
+    """Result of an offline render."""
+    frames: int
+    samplerate: int
+    elapsed: float
+    stems: dict[str, Path] | None = None
+
+    @property
+    def audio_seconds(self) -> float:
+        return self.frames / self.samplerate
+
+    @property
+    def realtime_factor(self) -> float:
+        """How many seconds of audio were rendered per second of wall time."""
+        if self.elapsed <= 0:
+            return float("inf")
+        return self.audio_seconds / self.elapsed
+
+class OfflineRenderer:
+    """Drives AudioManager's sequencing and mixing without a sound device, as fast as the CPU allows.
+
+    With a `source` (an InputSource), the modulation inputs follow `source.values_at` by audio time every
+    `control_rate` seconds, the same rate the live loop polls at, so file and synthetic inputs
+    render the same way every time.
+    """
+    def __init__(self, manager, chunk_blocks: int = 64, source=None, control_rate: float = 0.1):
+        self.manager = manager
+        self.chunk_blocks = max(1, chunk_blocks)
+        self.source = source
+        self.control_rate = control_rate
+
+    def render(self, path, seconds: float, subtype: str | None = None, stems: bool = False) -> RenderStats:
+        """Render `seconds` of audio to `path`. Format is picked from the extension (.wav, .flac, ...).
+
+        With `stems`, every bus is also written to its own file next to `path` (see `stem_path`)
+        from the same pass, so the stems line up sample for sample with the mix. Stems are taken
+        before the master FX."""
+        manager    = self.manager
+        samplerate = manager.samplerate
+        blocksize  = manager.blocksize
+        total      = int(seconds * samplerate)
+
+        size  = blocksize * self.chunk_blocks
+        chunk = np.zeros((size, 2), dtype=np.float32)
+        buses = list(manager.buses.values()) if stems else []
+        stem_chunks = [np.zeros((size, 2), dtype=np.float32) for _ in buses]
+        control_frames = max(1, int(self.control_rate * samplerate))
+        next_control = 0
+        written = 0
+
+        def open_file(target):
+            return sf.SoundFile(str(target), mode="w", samplerate=samplerate, channels=2, subtype=subtype)
+
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            out = stack.enter_context(open_file(path))
+            stem_files = [stack.enter_context(open_file(stem_path(path, bus.name))) for bus in buses]
+
+            while written < total:
+                filled = 0
+                while filled < size and written + filled < total:
+                    frames = min(blocksize, total - written - filled)
+                    if self.source is not None and written + filled >= next_control:
+                        follow_input(manager, self.source, (written + filled) / samplerate)
+                        next_control += control_frames
+
+                    # Same thread, so the lookahead is topped up between blocks instead of alongside them
+                    manager.fill_patterns()
+                    block = manager.render_block(frames)
+                    np.clip(block, -1.0, 1.0, out=chunk[filled:filled + frames])
+                    for bus, stem in zip(buses, stem_chunks):
+                        np.clip(bus.output, -1.0, 1.0, out=stem[filled:filled + frames])
+                    filled += frames
+
+                out.write(chunk[:filled])
+                for stem_file, stem in zip(stem_files, stem_chunks):
+                    stem_file.write(stem[:filled])
+                written += filled
+
+        return RenderStats(
+            frames=written, samplerate=samplerate, elapsed=time.perf_counter() - start,
+            stems={bus.name: stem_path(path, bus.name) for bus in buses} if stems else None,
+        )
@@ -1,19 +1,134 @@
 import asyncio
+import multiprocessing
+import re
+import threading
 import numpy as np
 import soundfile as sf
 from pathlib import Path
 from rich.console import Console
-from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from src.nonomi.audio.cache import (
+    SILENCE_DB, SampleCache, decode_sample, decode_to_cache, envelope_path, process_to_cache, trim_silence,
+)
+from src.nonomi.audio.engine import PianoFX
+from src.nonomi.audio.piano import NOTE_TO_SEMITONE
+
+VELOCITY_STEPS = 128
+SAMPLE_NAME = re.compile(r"^([A-G](?:sharp)?)(\d+)v(\d+)(?:-rr(\d+))?\.ogg$")
+
+def velocity_lut(layer_count: int) -> tuple[int, ...]:
+    """Velocity step -> layer index, splitting 0..1 evenly across the layers (softest first)."""
+    return tuple(min(layer_count - 1, step * layer_count // VELOCITY_STEPS) for step in range(VELOCITY_STEPS))
+
+def note_to_midi_semitone(note: str) -> int:
+    """'Csharp4' -> semitones above C0."""
+    name = note.rstrip("0123456789")
+    return NOTE_TO_SEMITONE[name] + int(note[len(name):]) * 12
+
+def pitch_shift(data: np.ndarray, semitones: int) -> np.ndarray:
+    """Resample by 2^(semitones/12) with linear interpolation (the samples are already lowpassed)."""
+    ratio = 2.0 ** (semitones / 12.0)
+    length = int((len(data) - 1) / ratio) + 1
+    positions = np.arange(length) * ratio
+    source = np.arange(len(data))
+
+    out = np.empty((length, data.shape[1]), dtype=np.float32)
+    for ch in range(data.shape[1]):
+        out[:, ch] = np.interp(positions, source, data[:, ch])
+
+    return out
+
+class LazySampleMap:
+    """Dict-like view of processed samples that loads on first lookup and evicts least recently used
+    entries once the memory budget is exceeded. Voices still holding an evicted array keep it alive."""
+    def __init__(self, sampler, fx, memory_budget_mb: float = 256.0):
+        self.sampler = sampler
+        self.fx_params = fx.params
+        self.budget = int(memory_budget_mb * 1024 * 1024)
+        self.nbytes = 0
+
+        self._entries: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                return data
+
+        recipe = self.sampler.derived.get(key)
+        if recipe is not None:
+            source, semitones = recipe
+            data = self.sampler.analyze(key, pitch_shift(self[source], semitones))
+
+        elif key in self.sampler.paths:
+            data = self.sampler.process_one(key, self.fx_params)
+
+        else:
+            return default
+
+        self._insert(key, data)
+        return data
+
+    def _insert(self, key: str, data: np.ndarray):
+        with self._lock:
+            if key in self._entries:
+                return
+
+            self._entries[key] = data
+            self.nbytes += data.nbytes
+            while self.nbytes > self.budget and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        data = self.get(key)
+        if data is None:
+            raise KeyError(key)
+        return data
+
+    def __contains__(self, key) -> bool:
+        return key in self.sampler.paths or key in self.sampler.derived
+
+    def __len__(self) -> int:
+        return len(self.sampler.paths) + len(self.sampler.derived)
+
+    def keys(self):
+        return list(self.sampler.paths) + list(self.sampler.derived)
+
+    def resident(self) -> list[str]:
+        with self._lock:
+            return list(self._entries)
 
 class AudioSampler:
-    """Sample loader and pre-processor for melodic and drum samples."""
-    def __init__(self, sample_dir, drum_dir=None):
+    """Sample loader and pre-processor for melodic and drum samples.
+
+    With `lazy=True` only the file index is built up front, and `preprocess` returns a
+    LazySampleMap capped at `memory_budget_mb` instead of processing everything.
+
+    Notes with no sample of their own are pitch-shifted from the nearest one by `prepare`,
+    off the audio thread, so a sparse sample set still covers every pitch.
+    """
+    def __init__(self, sample_dir, drum_dir=None, cache_dir=None, use_cache: bool = True,
+                 lazy: bool = False, memory_budget_mb: float = 256.0):
         self._loaded = None
         self.console = Console()
         self.samples = {}
+        self.paths: dict[str, Path] = {}
+        self.layers: dict[str, tuple] = {}
+        self.derived: dict[str, tuple[str, int]] = {}
+        self.envelopes: dict[str, np.ndarray] = {}
+        self._sampled: dict[int, str] = {}
+        self._prep = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sample-prep")
         self.drums = {}
         self.sample_dir = Path(sample_dir)
         self.drum_dir = Path(drum_dir) if drum_dir else None
+        self.cache = SampleCache(cache_dir) if use_cache else None
+        self.lazy = lazy
+        self.memory_budget_mb = memory_budget_mb
 
         self.notes = ["A", "Asharp", "B", "C", "Csharp", "D", "Dsharp", "E", "F", "Fsharp", "G", "Gsharp"]
         self.octaves = [1, 2, 3, 4, 5, 6]
@@ -28,26 +143,216 @@ class AudioSampler:
 
     @staticmethod
     def _load_one(note_key, file_path):
-        data, samplerate = sf.read(str(file_path), dtype='float32')
-        data = data - np.mean(data)
-        if data.ndim == 1:
-            data = np.column_stack([data, data])
+        data, samplerate = decode_sample(file_path)
+        return note_key, {"data": data, "samplerate": samplerate}
 
-        return note_key, {"data": data.astype(np.float32), "samplerate": samplerate}
+    @staticmethod
+    def _process_pool() -> ProcessPoolExecutor:
+        # spawn, not fork: we get here from asyncio worker threads
+        return ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+
+    def _index_layers(self) -> list[tuple[str, Path]]:
+        """Find every velocity layer (`C4v1.ogg`, `C4v3.ogg`) and round-robin variant (`C4v1-rr2.ogg`)."""
+        found: dict[str, dict[int, list[tuple[int, str, Path]]]] = {}
+        for path in sorted(self.sample_dir.glob("*.ogg")):
+            match = SAMPLE_NAME.match(path.name)
+            if not match:
+                continue
+
+            note, octv, layer, rr = match.groups()
+            if note not in self.notes or int(octv) not in self.octaves:
+                continue
+
+            key = f"{note}{octv}"
+            found.setdefault(key, {}).setdefault(int(layer), []).append((int(rr or 1), path.stem, path))
 
-    def load_samples(self):
         paths = []
-        for note in self.notes:
-            for octv in self.octaves:
-                key = f"{note}{octv}"
-                path = self.sample_dir / f"{key}v1.ogg"
-                if path.exists():
-                    paths.append((key, path))
+        self.layers = {}
+        self.derived = {}
+        self._sampled = {note_to_midi_semitone(key): key for key in found}
+        for key, layers in found.items():
+            variants = []
+            for layer in sorted(layers):
+                entries = sorted(layers[layer])
+                variants.append(tuple(name for _, name, _ in entries))
+                paths.extend((name, path) for _, name, path in entries)
+
+            # (layers, velocity LUT, round-robin counter per layer)
+            self.layers[key] = (tuple(variants), velocity_lut(len(variants)), [0] * len(variants))
+
+        return paths
+
+    def pick(self, note: str, velocity: float) -> str | None:
+        """O(1) velocity layer + round-robin pick, returns the sample key to play for `note`."""
+        entry = self.layers.get(note)
+        if entry is None:
+            return None
+
+        variants, lut, rr = entry
+        layer = lut[min(VELOCITY_STEPS - 1, max(0, int(velocity * VELOCITY_STEPS)))]
+        names = variants[layer]
+        if len(names) == 1:
+            return names[0]
+
+        i = rr[layer]
+        rr[layer] = (i + 1) % len(names)
+        return names[i]
+
+    def nearest(self, note: str) -> tuple[str | None, int]:
+        """Closest note that has real samples, and how many semitones to shift it to reach `note`."""
+        if not self._sampled:
+            return None, 0
+
+        target = note_to_midi_semitone(note)
+        # Ties go to the sample above: shifting down stretches the sample (it gets longer, not cut short)
+        # and can't push partials past Nyquist
+        source = min(self._sampled, key=lambda st: (abs(st - target), st < target))
+        return self._sampled[source], target - source
+
+    def _derive(self, note: str, processed):
+        source, semitones = self.nearest(note)
+        if source is None:
+            return
+
+        variants = []
+        for names in self.layers[source][0]:
+            shifted = tuple(note + name[len(source):] for name in names)
+            for name, shifted_name in zip(names, shifted):
+                self.derived[shifted_name] = (name, semitones)
+                self._shift_into(processed, shifted_name)
+            variants.append(shifted)
+
+        # Registered last so pick() never returns a key whose data isn't there yet
+        self.layers[note] = (tuple(variants), velocity_lut(len(variants)), [0] * len(variants))
+
+    def _shift_into(self, processed, key: str):
+        """Pitch-shift a derived `key` into `processed`. Lazy maps do this themselves on lookup."""
+        if self.lazy or key in processed:
+            return
+        name, semitones = self.derived[key]
+        processed[key] = self.analyze(key, pitch_shift(processed[name], semitones))
+
+    def _prepare(self, notes: list[str], processed):
+        for note in notes:
+            if note not in self.layers:
+                self._derive(note, processed)
+
+        # The sampler is shared, but every `processed` set needs the derived arrays of its own
+        for key in self.sample_keys(notes):
+            if self.lazy:
+                processed.get(key)
+            elif key in self.derived:
+                self._shift_into(processed, key)
+
+    def prepare(self, notes, processed):
+        """In the background: derive any of `notes` without samples and, in lazy mode, load them all.
+        Returns a Future."""
+        return self._prep.submit(self._prepare, list(notes), processed)
+
+    def sample_keys(self, notes) -> list[str]:
+        """Every layer and variant sample key behind `notes`."""
+        keys = []
+        for note in notes:
+            entry = self.layers.get(note)
+            if entry:
+                for names in entry[0]:
+                    keys.extend(names)
+
+        return keys
+
+    def load_samples(self):
+        paths = self._index_layers()
+
+        self.paths = dict(paths)
+        if self.lazy:
+            return
+
+        if self.cache is None:
+            with ThreadPoolExecutor() as ex:
+                results = ex.map(lambda p: self._load_one(*p), paths)
+
+            self.samples = dict(results)
+            return
+
+        targets = {key: self.cache.path_for(path, "raw") for key, path in paths}
+        missing = [(path, targets[key]) for key, path in paths if not targets[key].exists()]
+        if missing:
+            with self._process_pool() as ex:
+                list(ex.map(decode_to_cache, *zip(*missing)))
+
+        self.samples = {}
+        for key, path in paths:
+            data = self.cache.load(targets[key])
+            if data is None:
+                _, self.samples[key] = self._load_one(key, path)
+                continue
+
+            self.samples[key] = {"data": data, "samplerate": sf.info(str(path)).samplerate}
+
+    @staticmethod
+    def _fx_tag(params: dict) -> str:
+        return "pianofx|" + "|".join(f"{k}={v}" for k, v in sorted(params.items())) + f"|trim={SILENCE_DB}"
+
+    def analyze(self, name: str, data: np.ndarray) -> np.ndarray:
+        """Trim the silent tail off a processed sample and record its level envelope, returns the trimmed data."""
+        data, self.envelopes[name] = trim_silence(data)
+        return data
+
+    def _load_processed(self, name: str, target: Path, fallback) -> np.ndarray:
+        """Cached, already trimmed sample + envelope, or `fallback()` analyzed in place if the cache let us down."""
+        data = self.cache.load(target)
+        env_file = envelope_path(target)
+        if data is None or not env_file.exists():
+            return self.analyze(name, fallback())
+
+        self.envelopes[name] = np.load(env_file)
+        return data
+
+    def process_one(self, name: str, fx_params: dict) -> np.ndarray:
+        """Decode and process a single sample in this thread, going through the cache when enabled."""
+        path = self.paths[name]
+        if self.cache is None:
+            raw, _ = decode_sample(path)
+            return self.analyze(name, PianoFX(**fx_params).process(raw))
+
+        target = self.cache.path_for(path, self._fx_tag(fx_params))
+        if not target.exists():
+            process_to_cache(path, target, self.cache.path_for(path, "raw"), fx_params)
+
+        return self._load_processed(name, target, lambda: PianoFX(**fx_params).process(decode_sample(path)[0]))
+
+    def preprocess(self, fx):
+        """Run every loaded sample through `fx` (a PianoFX), reusing cached output when the file and FX params match."""
+        if self.lazy:
+            return LazySampleMap(self, fx, memory_budget_mb=self.memory_budget_mb)
+
+        if self.cache is None:
+            processed = {}
+            for name, sample in self.samples.items():
+                fx.board.reset()
+                processed[name] = self.analyze(name, fx.process(sample["data"]))
+            return processed
+
+        params = fx.params
+        tag = self._fx_tag(params)
+        targets = {name: self.cache.path_for(self.paths[name], tag) for name in self.samples}
+
+        missing = [name for name in self.samples if not targets[name].exists()]
+        if missing:
+            jobs = [
+                (self.paths[name], targets[name], self.cache.path_for(self.paths[name], "raw"), params)
+                for name in missing
+            ]
+            with self._process_pool() as ex:
+                list(ex.map(process_to_cache, *zip(*jobs)))
 
-        with ThreadPoolExecutor() as ex:
-            results = ex.map(lambda p: self._load_one(*p), paths)
+        processed = {}
+        for name, sample in self.samples.items():
+            processed[name] = self._load_processed(
+                name, targets[name], lambda: PianoFX(**params).process(sample["data"]),
+            )
 
-        self.samples = dict(results)
+        return processed
 
     @staticmethod
     def to_stereo(data):
@@ -75,7 +380,7 @@ class AudioSampler:
             if file_path.exists():
                 try:
                     data, samplerate = sf.read(str(file_path), dtype='float32')
-                    data = data - np.mean(data)
+                    data = self.to_stereo(data - np.mean(data))
 
                     self.drums[drum_name] = {
                         "data": data.astype(np.float32),
@@ -0,0 +1,181 @@
+import numpy as np
+
+class VoicePool:
+    """Fixed-capacity, array-backed voice pool that mixes straight into an output bus.
+
+    Active voices are kept packed in slots [0, count) so mixing only walks live voices,
+    and every buffer is allocated up front so mixing a block does no heap allocation.
+
+    At most `max_voices` voices sound at once: triggering past that steals one ("oldest" or
+    "quietest") by giving it a short fade-out in one of the spare slots. Voices whose output
+    drops below `tail_threshold` (after `min_tail` samples) are faded out the same way.
+
+    Voices triggered with a level envelope (peak per `hop` samples) are checked against it
+    instead: quiet blocks are skipped without touching the sample data, and once past
+    `min_tail` a quiet block ends the voice outright.
+    """
+    def __init__(self, capacity: int = 64, max_block: int = 4096, max_voices: int | None = None,
+                 steal: str = "oldest", fade_samples: int = 256, tail_threshold: float | None = 10 ** (-70 / 20),
+                 min_tail: int = 4410, hop: int = 512):
+        self.max_voices = max_voices or capacity
+        self.capacity = max(capacity, self.max_voices + max(1, self.max_voices // 8))
+        self.steal = steal
+        self.tail_threshold = tail_threshold
+        self.min_tail = min_tail
+        self.hop = hop
+        self.count = 0
+        self.sounding = 0  # live voices that are not fading out
+        self._serial = 0
+
+        capacity = self.capacity
+        self.samples: list[np.ndarray | None] = [None] * capacity
+        self.envelopes: list[np.ndarray | None] = [None] * capacity
+        self.positions  = np.zeros(capacity, dtype=np.int64)
+        self.lengths    = np.zeros(capacity, dtype=np.int64)
+        self.delays     = np.zeros(capacity, dtype=np.int64)
+        self.velocities = np.zeros(capacity, dtype=np.float32)
+        self.ages       = np.zeros(capacity, dtype=np.int64)
+        self.fades      = np.zeros(capacity, dtype=np.int64)  # samples of fade-out left, 0 = not fading
+
+        self.fade_samples = max(1, fade_samples)
+        self._ramp = np.linspace(1.0, 0.0, self.fade_samples, dtype=np.float32)[:, None]
+        self._scratch = np.zeros((max_block, 2), dtype=np.float32)
+
+    def trigger(self, data: np.ndarray, velocity: float = 1.0, delay: int = 0,
+                envelope: np.ndarray | None = None) -> int:
+        """Start a voice `delay` samples into the next mixed block. Returns its slot."""
+        if self.sounding >= self.max_voices:
+            victim = self._victim()
+            if self.positions[victim] == 0:
+                self._release(victim)  # hasn't made a sound yet, nothing to fade
+            else:
+                self._fade(victim)
+
+        if self.count >= self.capacity:
+            # Spare slots are all busy fading, cut the one closest to done
+            fading = self.fades[:self.count]
+            self._release(int(np.argmin(np.where(fading > 0, fading, np.iinfo(fading.dtype).max))))
+
+        slot = self.count
+        self.samples[slot]    = data
+        self.envelopes[slot]  = envelope
+        self.positions[slot]  = 0
+        self.lengths[slot]    = len(data)
+        self.delays[slot]     = delay
+        self.velocities[slot] = velocity
+        self.ages[slot]       = self._serial
+        self.fades[slot]      = 0
+        self._serial += 1
+        self.count += 1
+        self.sounding += 1
+        return slot
+
+    def _victim(self) -> int:
+        """Slot of the sounding voice to steal."""
+        live = self.fades[:self.count] == 0
+        if self.steal == "quietest":
+            # Piano-like samples decay, so velocity times the share left is a fair loudness guess
+            remaining = 1.0 - self.positions[:self.count] / np.maximum(self.lengths[:self.count], 1)
+            level = np.where(live, self.velocities[:self.count] * remaining, np.inf)
+        else:
+            level = np.where(live, self.ages[:self.count], np.iinfo(np.int64).max)
+
+        return int(np.argmin(level))
+
+    def _fade(self, slot: int):
+        if self.fades[slot] == 0:
+            self.fades[slot] = self.fade_samples
+            self.sounding -= 1
+
+    def _release(self, slot: int):
+        """Free a slot by moving the last live voice into it."""
+        if self.fades[slot] == 0:
+            self.sounding -= 1
+
+        last = self.count - 1
+        if slot != last:
+            self.samples[slot]    = self.samples[last]
+            self.envelopes[slot]  = self.envelopes[last]
+            self.positions[slot]  = self.positions[last]
+            self.lengths[slot]    = self.lengths[last]
+            self.delays[slot]     = self.delays[last]
+            self.velocities[slot] = self.velocities[last]
+            self.ages[slot]       = self.ages[last]
+            self.fades[slot]      = self.fades[last]
+
+        self.samples[last] = None
+        self.envelopes[last] = None
+        self.count = last
+
+    def _ensure_block(self, frames: int):
+        if frames > len(self._scratch):
+            self._scratch = np.zeros((frames, 2), dtype=np.float32)
+
+    def mix_into(self, bus: np.ndarray, gain: float = 1.0):
+        """Add every live voice into `bus` in place and advance them by len(bus) frames."""
+        frames = len(bus)
+        self._ensure_block(frames)
+        threshold = self.tail_threshold
+
+        slot = 0
+        while slot < self.count:
+            delay = int(self.delays[slot])
+            if delay >= frames:
+                self.delays[slot] = delay - frames
+                slot += 1
+                continue
+
+            pos    = int(self.positions[slot])
+            length = int(self.lengths[slot])
+            fade   = int(self.fades[slot])
+            n = min(frames - delay, length - pos)
+            if fade:
+                n = min(n, fade)
+
+            env = self.envelopes[slot]
+            if n > 0 and env is not None and threshold is not None:
+                hop = self.hop
+                level = env[pos // hop:(pos + n - 1) // hop + 1].max() * self.velocities[slot] * gain
+                if level < threshold:
+                    if pos >= self.min_tail:
+                        self._release(slot)
+                        continue
+
+                    # Quiet lead-in (e.g. a reversed sample), advance without mixing
+                    pos += n
+                    if fade:
+                        fade -= n
+                    n = 0
+
+            if n > 0:
+                out = self._scratch[:n]
+                np.multiply(self.samples[slot][pos:pos + n], self.velocities[slot] * gain, out=out)
+                if fade:
+                    start = self.fade_samples - fade
+                    out *= self._ramp[start:start + n]
+                    fade -= n
+                elif env is None and threshold is not None and pos >= self.min_tail and max(out.max(), -out.min()) < threshold:
+                    self._fade(slot)
+                    fade = self.fade_samples
+
+                bus[delay:delay + n] += out
+                pos += n
+
+            if pos >= length or (self.fades[slot] and fade <= 0):
+                self._release(slot)
+                continue
+
+            self.positions[slot] = pos
+            self.fades[slot] = fade
+            self.delays[slot] = 0
+            slot += 1
+
+    def clear(self):
+        for slot in range(self.count):
+            self.samples[slot] = None
+            self.envelopes[slot] = None
+        self.count = 0
+        self.sounding = 0
+
+    def __len__(self) -> int:
+        return self.count
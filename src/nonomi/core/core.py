@@ -1,45 +1,115 @@
 import asyncio
+from pathlib import Path
+
+import numpy as np
 from rich.console import Console
 
-from src.nonomi.input.cam import CameraInput
+from src.nonomi.input.source import open_input
 from src.nonomi.audio.sampler import AudioSampler
 from src.nonomi.audio.manager import AudioManager
+from src.nonomi.audio.render import OfflineRenderer
+from src.nonomi.audio.farm import RenderFarm, StreamJob
+from src.nonomi.utils.logger import log_metrics
 
 class NonomiBeat:
     """Main application class for Nonomi Beat."""
-    def __init__(self):
+    def __init__(self, lazy_samples: bool = False, memory_budget_mb: float = 256.0, seed: int | None = None,
+                 chord_cache_mb: float = 0.0, input_spec: str | None = None, routes=None):
         self.manager = None
+        self.input_spec = input_spec  # see open_input, live mode falls back to the camera
+        self.seed    = seed
+        self.chord_cache_mb = chord_cache_mb
+        self.routes  = routes  # modulation routes, None keeps AudioManager.DEFAULT_ROUTES
         self.sampler = AudioSampler(
             sample_dir="src/samples/PianoSamples",
-            drum_dir="src/samples/DrumSamples"
+            drum_dir="src/samples/DrumSamples",
+            lazy=lazy_samples,
+            memory_budget_mb=memory_budget_mb,
         )
 
-        self.camera  = None
+        self.source  = None
         self.console = Console()
+        self._metrics_task = None
 
-    async def main(self, ready_event: asyncio.Event = None):
-        await self.sampler.start()
-
-        self.manager = AudioManager(
+    def _build_manager(self) -> AudioManager:
+        return AudioManager(
             sampler=self.sampler,
             bpm=156.0,
             samplerate=44100,
             blocksize=512,
+            seed=self.seed,
+            chord_cache_mb=self.chord_cache_mb,
+            routes=self.routes,
         )
+
+    async def main(self, ready_event: asyncio.Event = None):
+        await self.sampler.start()
+
+        self.manager = self._build_manager()
         self.manager.start()
         self.manager.reset_clock()
+        self._metrics_task = asyncio.create_task(log_metrics(self.manager.metrics))
 
-        self.camera = CameraInput(update_rate=0.1)
-        await self.camera.start()
+        self.source = open_input(self.input_spec or "camera")
+        await self.source.start()
 
         if ready_event:
             ready_event.set()
 
         while True:
-            brightness, warmth = self.camera.get_values()
-            self.manager.update_brightness(brightness)
+            self.manager.update_inputs(self.source.features())
+            await asyncio.to_thread(self.manager.fill_patterns)
             await asyncio.sleep(0.1)
 
+    async def render(self, path: str, minutes: float, stems: bool = False):
+        """Render `minutes` of audio straight to a file, no sound device or camera needed.
+        With `stems`, every bus also gets its own file from the same pass. An input spec, if set,
+        is followed by audio time."""
+        await self.sampler.start()
+        self.source = open_input(self.input_spec) if self.input_spec else None
+
+        self.manager = self._build_manager()
+        self.manager.reset_clock()
+
+        stats = await asyncio.to_thread(OfflineRenderer(self.manager, source=self.source).render, path, minutes * 60, stems=stems)
+        self.console.print(
+            f"Rendered {stats.audio_seconds / 60:.1f} min to {path} in {stats.elapsed:.1f}s "
+            f"({stats.realtime_factor:.1f}x realtime, seed {self.manager.seed}) :3",
+            style="green",
+        )
+        if self.manager.chord_cache is not None:
+            cache = self.manager.chord_cache
+            self.console.print(f"  chord cache: {len(cache)} chords, {cache.hit_rate:.0%} hits", style="green")
+        for name, stem in (stats.stems or {}).items():
+            self.console.print(f"  {name}: {stem}", style="green")
+        return stats
+
+    async def render_streams(self, path: str, minutes: float, streams: int, workers: int | None = None):
+        """Render `streams` independent tracks (seeds seed, seed+1, ...) in parallel worker processes.
+        `out.wav` becomes `out-01.wav`, `out-02.wav`, ..."""
+        base = Path(path)
+        seed = self.seed if self.seed is not None else int(np.random.SeedSequence().entropy % 2**32)
+        jobs = [
+            StreamJob(base.with_name(f"{base.stem}-{i + 1:02d}{base.suffix}"), minutes * 60, seed + i, self.input_spec)
+            for i in range(streams)
+        ]
+
+        farm = RenderFarm(workers=workers, chord_cache_mb=self.chord_cache_mb, routes=self.routes)
+        results = await asyncio.to_thread(farm.render, jobs)
+        for r in results:
+            if r.failed:
+                self.console.print(f"{r.path} failed after {r.frames / r.samplerate:.1f}s :/", style="red")
+                continue
+            self.console.print(
+                f"Rendered {r.path} (seed {r.seed}) in {r.elapsed:.1f}s: {r.realtime_factor:.1f}x realtime, "
+                f"{r.render_factor:.1f}x while rendering, {r.waiting:.1f}s waiting on the writer",
+                style="green",
+            )
+        return results
+
     async def stop(self):
+        if self._metrics_task:
+            self._metrics_task.cancel()
         await self.manager.stop()
-        await self.camera.stop()
\ No newline at end of file
+        if self.source:
+            await self.source.stop()
\ No newline at end of file
@@ -0,0 +1,222 @@
+import asyncio
+
+import numpy as np
+import soundfile as sf
+
+from src.nonomi.input.source import InputSource, TimelineInput
+from src.nonomi.utils.ringbuffer import AudioRingBuffer
+
+class AudioFeatures:
+    """Streaming loudness, spectral centroid and onset rate, one `hop` of mono audio at a time.
+
+    Everything lives in buffers allocated up front; per hop it is one windowed FFT plus a few
+    dot products. Onsets are spectral-flux peaks over an adaptive threshold, counted in a fixed
+    ring of hops covering the last `window_seconds`, so the rate is a running count.
+
+    Normalised 0..1 values for modulation: `loudness` (-60..0 dBFS), `centroid` (100 Hz..8 kHz on a
+    log scale) and `onsets` (0..`max_onset_rate` per second).
+    """
+    def __init__(self, samplerate: int = 44100, hop: int = 1024, fft_size: int = 2048, window_seconds: float = 4.0,
+                 smoothing: float = 0.8, flux_threshold: float = 1.5, max_onset_rate: float = 8.0):
+        self.samplerate = samplerate
+        self.hop = hop
+        self.smoothing = smoothing
+        self.flux_threshold = flux_threshold
+        self.max_onset_rate = max_onset_rate
+
+        self._frame = np.zeros(fft_size, dtype=np.float32)
+        self._window = np.hanning(fft_size).astype(np.float32)
+        self._windowed = np.zeros(fft_size, dtype=np.float32)
+        bins = fft_size // 2 + 1
+        self._freqs = np.fft.rfftfreq(fft_size, 1.0 / samplerate).astype(np.float32)
+        self._mag = np.zeros(bins, dtype=np.float32)
+        self._prev = np.zeros(bins, dtype=np.float32)
+        self._diff = np.zeros(bins, dtype=np.float32)
+
+        self.window_seconds = window_seconds
+        self.window_hops = max(1, int(window_seconds * samplerate / hop))  # history the onset rate depends on
+        self._onsets = np.zeros(self.window_hops, dtype=np.int8)
+        self._onset_pos = 0
+        self._onset_count = 0
+        self._flux_mean = 0.0
+        self._was_onset = False
+
+        self.power = 0.0  # smoothed mean square
+        self.centroid_hz = 0.0
+        self.onset_rate = 0.0
+
+    def process(self, block: np.ndarray):
+        """Feed exactly `hop` mono samples."""
+        hop = self.hop
+        frame = self._frame
+        frame[:-hop] = frame[hop:]
+        frame[-hop:] = block
+
+        power = float(np.dot(block, block)) / hop
+
+        np.multiply(frame, self._window, out=self._windowed)
+        np.abs(np.fft.rfft(self._windowed), out=self._mag)
+        total = float(self._mag.sum())
+        centroid = float(np.dot(self._freqs, self._mag)) / total if total > 1e-9 else 0.0
+
+        np.subtract(self._mag, self._prev, out=self._diff)
+        np.maximum(self._diff, 0.0, out=self._diff)
+        flux = float(self._diff.sum())
+        self._prev[:] = self._mag
+
+        onset = flux > self.flux_threshold * self._flux_mean + 1e-3 and power > 1e-6 and not self._was_onset
+        self._was_onset = onset
+        self._flux_mean = 0.95 * self._flux_mean + 0.05 * flux
+
+        self._onset_count += int(onset) - int(self._onsets[self._onset_pos])
+        self._onsets[self._onset_pos] = onset
+        self._onset_pos = (self._onset_pos + 1) % len(self._onsets)
+        self.onset_rate = self._onset_count / self.window_seconds
+
+        # Smoothed in power, not dB, so gaps between hits don't drag the level to the floor
+        a = self.smoothing
+        self.power = a * self.power + (1 - a) * power
+        self.centroid_hz = a * self.centroid_hz + (1 - a) * centroid
+
+    def reset(self):
+        self._frame[:] = 0
+        self._prev[:] = 0
+        self._onsets[:] = 0
+        self._onset_pos = self._onset_count = 0
+        self._flux_mean = 0.0
+        self._was_onset = False
+        self.power, self.centroid_hz, self.onset_rate = 0.0, 0.0, 0.0
+
+    @property
+    def loudness_db(self) -> float:
+        return 10.0 * float(np.log10(self.power + 1e-12))
+
+    @property
+    def loudness(self) -> float:
+        return min(1.0, max(0.0, (self.loudness_db + 60.0) / 60.0))
+
+    @property
+    def centroid(self) -> float:
+        if self.centroid_hz <= 100.0:
+            return 0.0
+        return min(1.0, float(np.log(self.centroid_hz / 100.0) / np.log(80.0)))
+
+    @property
+    def onsets(self) -> float:
+        return min(1.0, self.onset_rate / self.max_onset_rate)
+
+    def features(self) -> dict[str, float]:
+        return {"loudness": self.loudness, "centroid": self.centroid, "onsets": self.onsets}
+
+class MicInput(InputSource):
+    """Live microphone / line-in. The device callback only copies into a ring; analysis runs
+    every `update_rate` seconds on a worker thread over whatever arrived since.
+
+    Brightness follows the spectral centroid and hue the loudness, so it drives the same
+    modulation as the camera; all three features are in `features()`.
+    """
+    def __init__(self, device=None, samplerate: int = 44100, update_rate: float = 0.1, hop: int = 1024):
+        super().__init__()
+        self.device = device
+        self.samplerate = samplerate
+        self.update_rate = update_rate
+        self.analyzer = AudioFeatures(samplerate, hop=hop)
+
+        self._ring = AudioRingBuffer(capacity=samplerate * 2, channels=1)
+        self._read_index = 0
+        self._stream = None
+        self._task: asyncio.Task | None = None
+
+    def _callback(self, indata, frames, time_info, status):
+        self._ring.write(indata[:, :1])
+
+    async def start(self):
+        # Imported here so hosts without PortAudio can still use the other inputs
+        import sounddevice as sd
+
+        self._stream = sd.InputStream(
+            device=self.device, samplerate=self.samplerate, channels=1, dtype=np.float32, callback=self._callback,
+        )
+        self._stream.start()
+        self._task = asyncio.create_task(self._poll())
+
+    def _analyse_new(self):
+        hop = self.analyzer.hop
+        ring = self._ring
+        written = ring.write_index  # the device thread keeps writing, work up to this snapshot
+        if written - self._read_index > ring.capacity - hop:
+            # Fell behind by more than the ring holds, skip ahead
+            self._read_index = written - ring.capacity // 2
+
+        while written - self._read_index >= hop:
+            self.analyzer.process(ring.frames_at(self._read_index, hop)[:, 0])
+            self._read_index += hop
+
+        self.brightness, self.hue = self.analyzer.centroid, self.analyzer.loudness
+
+    async def _poll(self):
+        while True:
+            await asyncio.to_thread(self._analyse_new)
+            await asyncio.sleep(self.update_rate)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+        if self._stream:
+            self._stream.stop()
+            self._stream.close()
+
+    def features(self) -> dict[str, float]:
+        return {**super().features(), **self.analyzer.features()}
+
+class AudioFileInput(TimelineInput):
+    """An audio file (WAV, FLAC, ...) analysed as if it were playing, looped; stands in for the mic
+    in tests and drives renders deterministically. Reads one hop at a time into a fixed buffer."""
+    def __init__(self, path: str, loop: bool = True, update_rate: float = 0.1, hop: int = 1024):
+        super().__init__(update_rate)
+        self.path = path
+        self.loop = loop
+        self.file = sf.SoundFile(path)
+        self.analyzer = AudioFeatures(self.file.samplerate, hop=hop)
+
+        self._block = np.zeros((hop, self.file.channels), dtype=np.float32)
+        self._mono = np.zeros(hop, dtype=np.float32)
+        self._hop_index = 0  # hops analysed so far
+
+    def _read_hop(self):
+        read = len(self.file.read(out=self._block))
+        if read < self.analyzer.hop:
+            self._block[read:] = 0
+            if self.loop:
+                self.file.seek(0)
+        np.mean(self._block, axis=1, out=self._mono)
+
+    def values_at(self, t: float) -> tuple[float, float]:
+        hop = self.analyzer.hop
+        target = int(t * self.file.samplerate / hop)
+        if target < self._hop_index:
+            self.file.seek(0)
+            self.analyzer.reset()
+            self._hop_index = 0
+
+        # Long jumps only need enough history to refill the onset window
+        skip = target - self._hop_index - self.analyzer.window_hops
+        if skip > 0:
+            frames = (self._hop_index + skip) * hop
+            self.file.seek(frames % self.file.frames if self.loop else min(frames, self.file.frames))
+            self._hop_index += skip
+
+        while self._hop_index < target:
+            self._read_hop()
+            self.analyzer.process(self._mono)
+            self._hop_index += 1
+
+        self.brightness, self.hue = self.analyzer.centroid, self.analyzer.loudness
+        return self.brightness, self.hue
+
+    def features(self) -> dict[str, float]:
+        return {**super().features(), **self.analyzer.features()}
+
+    async def stop(self):
+        await super().stop()
+        self.file.close()
@@ -1,55 +1,112 @@
 import cv2
 import numpy as np
 import asyncio
+import time
 from collections import deque
 import rich
 
-class CameraInput:
-    def __init__(self, buffer_size=30, update_rate=0.05):
+from src.nonomi.input.source import InputSource
+
+class FrameAnalyzer:
+    """Brightness (mean HSV value) and dominant hue of a BGR frame, on a small preallocated copy.
+
+    Frames are shrunk to `size` before colour conversion, so the cost doesn't depend on the
+    resolution of whatever produced them.
+    """
+    def __init__(self, size=(80, 60)):
+        width, height = size
+        self.size = size
+        self._small = np.zeros((height, width, 3), dtype=np.uint8)
+        self._hsv = np.zeros((height, width, 3), dtype=np.uint8)
+
+    def analyse(self, frame) -> tuple[float, float]:
+        cv2.resize(frame, self.size, dst=self._small, interpolation=cv2.INTER_NEAREST)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2HSV, dst=self._hsv)
+
+        b_val = float(self._hsv[:, :, 2].mean()) / 255.0
+        h_val = int(np.argmax(np.bincount(self._hsv[:, :, 0].ravel(), minlength=180))) / 179.0
+        return b_val, h_val
+
+class CameraInput(InputSource):
+    """Brightness and dominant hue of the camera image, averaged over the last `buffer_size` analyses.
+
+    Frames are analysed at most once per `update_rate` seconds; the ones in between are never
+    decoded. The camera is asked for a small capture size, and FrameAnalyzer shrinks whatever
+    it delivers before doing any colour work.
+    """
+    def __init__(self, buffer_size=30, update_rate=0.05, analysis_size=(80, 60), capture_size=(320, 240),
+                 device=0):
+        super().__init__()
         self.brightness_buffer = deque(maxlen=buffer_size)
         self.hue_buffer = deque(maxlen=buffer_size)
         self.update_rate = update_rate
+        self.capture_size = capture_size
+        self.device = device
+        self.analyzer = FrameAnalyzer(analysis_size)
 
-        self.brightness = 0.5
-        self.hue = 0
+        # Running sums over the buffers, so the averages are O(1) per frame
+        self._brightness_sum = 0.0
+        self._hue_sum = 0.0
 
         self.cap = None
         self._running = False
 
     async def start(self):
-        self.cap = cv2.VideoCapture(0)
+        self.cap = cv2.VideoCapture(self.device)
         if not self.cap.isOpened():
             rich.print("[bold red]Error: Could not open camera. Please check your camera connection and permissions :([/bold red]")
             return
 
+        # Hints only, drivers are free to ignore them
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.capture_size[0])
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.capture_size[1])
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
         self._running = True
         asyncio.create_task(self._capture_loop())
 
-    async def _capture_loop(self):
-        while self._running:
-            ret, frame = await asyncio.to_thread(self.cap.read)
+    def _read_latest(self):
+        """Grab and decode one frame. Only as fresh as the driver queue is short, which is why
+        `start` asks for CAP_PROP_BUFFERSIZE=1; a driver that ignores it can hand back a stale frame."""
+        if not self.cap.grab():
+            return None
+        ret, frame = self.cap.retrieve()
+        return frame if ret else None
 
-            if not ret or frame is None:
-                rich.print("[yellow]Camera dropped a frame :/[/yellow]")
-                await asyncio.sleep(self.update_rate)
-                continue
+    def _push(self, b_val: float, h_val: float):
+        if len(self.brightness_buffer) == self.brightness_buffer.maxlen:
+            self._brightness_sum -= self.brightness_buffer[0]
+            self._hue_sum -= self.hue_buffer[0]
+
+        self.brightness_buffer.append(b_val)
+        self.hue_buffer.append(h_val)
+        self._brightness_sum += b_val
+        self._hue_sum += h_val
+
+        self.brightness = self._brightness_sum / len(self.brightness_buffer)
+        self.hue = self._hue_sum / len(self.hue_buffer)
 
-            hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-            pixels = hsv[::4, ::4]
-            b_val = np.mean(pixels[:, :, 2]) / 255.0
-            h_val = np.argmax(np.bincount(pixels[:, :, 0].ravel(), minlength=180)) / 179.0
+    def _step(self):
+        """Worker thread: grab, decode and analyse one frame."""
+        frame = self._read_latest()
+        if frame is None:
+            return None
+        return self.analyzer.analyse(frame)
 
-            self.brightness_buffer.append(b_val)
-            self.hue_buffer.append(h_val)
+    async def _capture_loop(self):
+        next_at = time.monotonic()
+        while self._running:
+            values = await asyncio.to_thread(self._step)
+            if values is None:
+                rich.print("[yellow]Camera dropped a frame :/[/yellow]")
+            else:
+                self._push(*values)
 
-            if self.brightness_buffer:
-                self.brightness = sum(self.brightness_buffer) / len(self.brightness_buffer)
-                self.hue = sum(self.hue_buffer) / len(self.hue_buffer)
+            # Fixed analysis rate, however fast the camera delivers
+            next_at = max(next_at + self.update_rate, time.monotonic())
+            await asyncio.sleep(next_at - time.monotonic())
 
     async def stop(self):
         self._running = False
         if self.cap:
             self.cap.release()
-
-    def get_values(self):
-        return self.brightness, self.hue
@@ -0,0 +1,101 @@
+import glob
+
+import numpy as np
+
+from src.nonomi.input.source import TimelineInput
+
+# OpenCV is imported inside the video and image inputs, so CSV input works without it
+
+class VideoInput(TimelineInput):
+    """A video file as input, looped. Frames are read in order as time moves forward
+    (skipped ones are grabbed, not decoded) and only seeks when time jumps back."""
+    def __init__(self, path: str, loop: bool = True, update_rate: float = 0.1, analysis_size=(80, 60)):
+        import cv2
+        from src.nonomi.input.cam import FrameAnalyzer
+
+        super().__init__(update_rate)
+        self.path = path
+        self.loop = loop
+        self.analyzer = FrameAnalyzer(analysis_size)
+
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise ValueError(f"Could not open video '{path}'")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.frame_count = max(1, int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+
+        self._index = -1  # frame the cap is positioned after
+        self._values = (self.brightness, self.hue)
+
+    def values_at(self, t: float) -> tuple[float, float]:
+        import cv2
+
+        index = int(t * self.fps)
+        index = index % self.frame_count if self.loop else min(index, self.frame_count - 1)
+        if index == self._index:
+            return self._values
+
+        if index < self._index:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+        else:
+            for _ in range(index - self._index - 1):
+                self.cap.grab()
+
+        ret, frame = self.cap.read()
+        self._index = index
+        if ret and frame is not None:
+            self._values = self.analyzer.analyse(frame)
+        return self._values
+
+    async def stop(self):
+        await super().stop()
+        self.cap.release()
+
+class ImageSequenceInput(TimelineInput):
+    """Image files matching `pattern`, in name order, `fps` images per second, looped."""
+    def __init__(self, pattern: str, fps: float = 1.0, update_rate: float = 0.1, analysis_size=(80, 60)):
+        from src.nonomi.input.cam import FrameAnalyzer
+
+        super().__init__(update_rate)
+        self.paths = sorted(glob.glob(pattern))
+        if not self.paths:
+            raise ValueError(f"No images match '{pattern}'")
+        self.fps = fps
+        self.analyzer = FrameAnalyzer(analysis_size)
+
+        self._index = -1
+        self._values = (self.brightness, self.hue)
+
+    def values_at(self, t: float) -> tuple[float, float]:
+        index = int(t * self.fps) % len(self.paths)
+        if index != self._index:
+            import cv2
+
+            frame = cv2.imread(self.paths[index])
+            self._index = index
+            if frame is not None:
+                self._values = self.analyzer.analyse(frame)
+        return self._values
+
+class CSVInput(TimelineInput):
+    """Recorded `time,brightness,hue` rows (a header line is fine), linearly interpolated and looped."""
+    def __init__(self, path: str, loop: bool = True, update_rate: float = 0.1):
+        super().__init__(update_rate)
+        rows = np.genfromtxt(path, delimiter=",", dtype=np.float64, invalid_raise=False)
+        rows = np.atleast_2d(rows)
+        rows = rows[~np.isnan(rows).any(axis=1)]
+        if len(rows) == 0 or rows.shape[1] < 3:
+            raise ValueError(f"'{path}' has no time,brightness,hue rows")
+
+        self.times = rows[:, 0] - rows[0, 0]
+        self.values = np.clip(rows[:, 1:3], 0.0, 1.0)
+        self.loop = loop
+        self.duration = float(self.times[-1])
+
+    def values_at(self, t: float) -> tuple[float, float]:
+        if self.loop and self.duration > 0:
+            t %= self.duration
+        return (
+            float(np.interp(t, self.times, self.values[:, 0])),
+            float(np.interp(t, self.times, self.values[:, 1])),
+        )
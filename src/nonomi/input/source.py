@@ -0,0 +1,135 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+
+AUDIO_SUFFIXES = ("wav", "flac", "ogg", "mp3", "aiff", "aif")
+
+class InputSource:
+    """Anything that drives the generator: yields brightness and hue, both 0..1.
+
+    `get_values` is the live reading. `values_at(t)` asks for the value `t` seconds into the
+    source's timeline; sources that have a timeline (files, synthetic) answer it deterministically,
+    so offline renders can follow them by audio time instead of wall time. Live sources just
+    return their current reading.
+    """
+    def __init__(self):
+        self.brightness = 0.5
+        self.hue = 0.0
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def get_values(self) -> tuple[float, float]:
+        return self.brightness, self.hue
+
+    def values_at(self, t: float) -> tuple[float, float]:
+        return self.get_values()
+
+    def features(self) -> dict[str, float]:
+        """Every scalar this source measures, 0..1, by name. Richer sources add their own."""
+        return {"brightness": self.brightness, "hue": self.hue}
+
+class TimelineInput(InputSource, ABC):
+    """Input whose values are a function of time. Implement `values_at`; once started it is
+    also polled against the wall clock every `update_rate` seconds for live use."""
+    def __init__(self, update_rate: float = 0.1):
+        super().__init__()
+        self.update_rate = update_rate
+        self._task: asyncio.Task | None = None
+
+    @abstractmethod
+    def values_at(self, t: float) -> tuple[float, float]:
+        ...
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._poll())
+
+    async def _poll(self):
+        started = time.monotonic()
+        while True:
+            # File sources may decode here, keep it off the event loop
+            self.brightness, self.hue = await asyncio.to_thread(self.values_at, time.monotonic() - started)
+            await asyncio.sleep(self.update_rate)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+def open_input(spec: str) -> InputSource:
+    """Build a source from a spec string:
+
+        camera[:N]            webcam N (default 0)
+        video:PATH            video file, looped
+        images:GLOB[@FPS]     image files in name order, looped (default 1 image per second)
+        csv:PATH              `time,brightness,hue` rows, interpolated and looped
+        synthetic[:SEED]      slow deterministic drift, no hardware or files needed
+        mic[:DEVICE]          background audio from a microphone / line-in
+        audio:PATH            an audio file analysed as if it were the mic, looped
+
+    A bare path is taken by extension: csv, audio (.wav, .flac, ...) or otherwise video.
+    """
+    kind, _, arg = spec.partition(":")
+    if kind not in ("camera", "video", "images", "csv", "synthetic", "mic", "audio"):
+        suffix = spec.lower().rsplit(".", 1)[-1]
+        kind = "csv" if suffix == "csv" else "audio" if suffix in AUDIO_SUFFIXES else "video"
+        arg = spec
+
+    if kind == "camera":
+        from src.nonomi.input.cam import CameraInput
+        return CameraInput(device=int(arg) if arg else 0, update_rate=0.1)
+
+    if kind in ("mic", "audio"):
+        from src.nonomi.input.audio import AudioFileInput, MicInput
+        if kind == "audio":
+            return AudioFileInput(arg)
+        return MicInput(device=int(arg) if arg.isdigit() else (arg or None))
+
+    if kind == "synthetic":
+        from src.nonomi.input.synthetic import SyntheticInput
+        return SyntheticInput(seed=int(arg) if arg else 0)
+
+    from src.nonomi.input.files import CSVInput, ImageSequenceInput, VideoInput
+    if kind == "video":
+        return VideoInput(arg)
+    if kind == "images":
+        pattern, _, fps = arg.partition("@")
+        return ImageSequenceInput(pattern, fps=float(fps) if fps else 1.0)
+    return CSVInput(arg)
+
+class InputHub:
+    """Shares one running source per spec, so any number of sessions can follow the same video
+    (or camera) while it is opened and decoded once."""
+    def __init__(self):
+        self._sources: dict[str, list] = {}  # spec -> [source, users]
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, spec: str) -> InputSource:
+        async with self._lock:
+            entry = self._sources.get(spec)
+            if entry is None:
+                source = open_input(spec)
+                await source.start()
+                entry = self._sources[spec] = [source, 0]
+            entry[1] += 1
+            return entry[0]
+
+    async def release(self, spec: str):
+        async with self._lock:
+            entry = self._sources.get(spec)
+            if entry is None:
+                return
+            entry[1] -= 1
+            if entry[1] <= 0:
+                del self._sources[spec]
+                await entry[0].stop()
+
+    async def close(self):
+        async with self._lock:
+            for source, _ in self._sources.values():
+                await source.stop()
+            self._sources.clear()
@@ -0,0 +1,20 @@
+import numpy as np
+
+from src.nonomi.input.source import TimelineInput
+
+class SyntheticInput(TimelineInput):
+    """Slow drift made of a few seeded sine waves, for headless renders and benchmarks.
+    The same seed always gives the same curve."""
+    def __init__(self, seed: int = 0, period: float = 90.0, update_rate: float = 0.1):
+        super().__init__(update_rate)
+        rng = np.random.default_rng(seed)
+        # Three partials per value: periods around `period`, random phases and weights
+        self._freqs = 1.0 / (period * rng.uniform(0.5, 2.0, (2, 3)))
+        self._phases = rng.uniform(0.0, 2 * np.pi, (2, 3))
+        weights = rng.uniform(0.2, 1.0, (2, 3))
+        self._weights = weights / weights.sum(axis=1, keepdims=True)
+
+    def values_at(self, t: float) -> tuple[float, float]:
+        waves = np.sin(2 * np.pi * self._freqs * t + self._phases)
+        brightness, hue = 0.5 + 0.45 * (waves * self._weights).sum(axis=1)
+        return float(brightness), float(hue)
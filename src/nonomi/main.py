@@ -1,6 +1,9 @@
 import asyncio
 import argparse
 
+from src.nonomi.audio.modulation import parse_route
+from src.nonomi.core.core import NonomiBeat
+from src.nonomi.net.server import NonomiServer
 from src.nonomi.ui.cli import NonomiBeatCLI
 
 parser = argparse.ArgumentParser(
@@ -8,18 +11,91 @@ parser = argparse.ArgumentParser(
     description='An adaptive LoFi generator'
 )
 parser.add_argument(
-    "--mode", choices=["cli", "tui"], default="cli",
+    "--mode", choices=["cli", "tui", "render", "server"], default="cli",
     help="Choose the interface mode (default: cli)"
 )
 parser.add_argument(
     "--fs", action='store_true',
     help="Clear terminal and run in 'full-screen' mode for CLI"
 )
+parser.add_argument(
+    "--out", default="nonomi.wav",
+    help="Output file for render mode, format picked from the extension (default: nonomi.wav)"
+)
+parser.add_argument(
+    "--minutes", type=float, default=5.0,
+    help="How many minutes of audio to render in render mode (default: 5)"
+)
+parser.add_argument(
+    "--stems", action='store_true',
+    help="In render mode, also write each bus (piano, bass, melody, drums) to its own file"
+)
+parser.add_argument(
+    "--streams", type=int, default=1,
+    help="In render mode, render this many independent tracks in parallel processes (out-01.wav, ...)"
+)
+parser.add_argument(
+    "--workers", type=int,
+    help="Worker processes for --streams (default: one per core)"
+)
+parser.add_argument(
+    "--host", default="127.0.0.1",
+    help="Address to listen on in server mode (default: 127.0.0.1)"
+)
+parser.add_argument(
+    "--port", type=int, default=8765,
+    help="Port to listen on in server mode (default: 8765)"
+)
+parser.add_argument(
+    "--max-sessions", type=int, default=32,
+    help="Most generator sessions server mode will host at once (default: 32)"
+)
+parser.add_argument(
+    "--input",
+    help="What drives the music: camera[:N], video:PATH, images:GLOB[@FPS], csv:PATH or synthetic[:SEED] "
+         "(default: camera live, nothing in render mode)"
+)
+parser.add_argument(
+    "--mod", action="append", type=parse_route, metavar="SOURCE:TARGET[:CURVE[:AMOUNT[:SECONDS]]]",
+    help="Route an input (brightness, hue, loudness, centroid, onsets) to tempo, drum_vol, widener, "
+         "melody_density or cutoff; repeatable, replaces the default brightness:cutoff"
+)
+parser.add_argument(
+    "--seed", type=int,
+    help="Seed for every random choice, the same seed renders the same track (default: random)"
+)
+parser.add_argument(
+    "--chord-cache", type=float, default=0.0, metavar="MB",
+    help="Play chords as pre-rendered voices from a cache of this many MB (default: 0, off)"
+)
+parser.add_argument(
+    "--lazy-samples", action='store_true',
+    help="Load piano samples on demand instead of all at startup (smaller footprint per instance)"
+)
+parser.add_argument(
+    "--sample-budget", type=float, default=256.0,
+    help="Memory budget in MB for lazily loaded samples (default: 256)"
+)
 args = parser.parse_args()
+app_kwargs = {"lazy_samples": args.lazy_samples, "memory_budget_mb": args.sample_budget, "seed": args.seed,
+              "chord_cache_mb": args.chord_cache, "input_spec": args.input, "routes": args.mod}
 
 async def main():
     if args.mode == "cli":
-        await NonomiBeatCLI().start(True if args.fs else False)
+        await NonomiBeatCLI(**app_kwargs).start(True if args.fs else False)
+
+    elif args.mode == "render" and args.streams > 1:
+        await NonomiBeat(**app_kwargs).render_streams(args.out, args.minutes, args.streams, args.workers)
+
+    elif args.mode == "render":
+        await NonomiBeat(**app_kwargs).render(args.out, args.minutes, stems=args.stems)
+
+    elif args.mode == "server":
+        await NonomiServer(
+            host=args.host, port=args.port, max_sessions=args.max_sessions,
+            lazy_samples=args.lazy_samples, memory_budget_mb=args.sample_budget, chord_cache_mb=args.chord_cache,
+            routes=args.mod,
+        ).serve_forever()
 
     elif args.mode == "tui":
         print("TUI mode is not implemented yet. Please use CLI mode.")
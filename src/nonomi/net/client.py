@@ -0,0 +1,124 @@
+"""Local listener for the NonomiBeat server, stands in for real clients when load testing.
+
+    python -m src.nonomi.net.client --listeners 24 --seconds 30
+    python -m src.nonomi.net.client --listeners 1 --out session.wav
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from rich.console import Console
+from rich.table import Table
+
+WAV_HEADER_BYTES = 44
+BYTES_PER_FRAME = 4  # 16-bit stereo
+
+async def request(host: str, port: int, method: str, path: str, payload=None):
+    """One JSON request/response round trip, returns (status, decoded body)."""
+    reader, writer = await asyncio.open_connection(host, port)
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Length: {len(body)}\r\n"
+        f"Connection: close\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+
+    data = await reader.readexactly(length)
+    writer.close()
+    return status, json.loads(data) if data else None
+
+async def listen(host: str, port: int, session_id: str, seconds: float, out_path: str | None = None) -> dict:
+    """Read a session's stream for `seconds` of wall time and measure how well it kept up."""
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"GET /sessions/{session_id}/stream HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+    await writer.drain()
+
+    while await reader.readline() not in (b"\r\n", b""):
+        pass
+
+    out = open(out_path, "wb") if out_path else None
+    received, max_gap = 0, 0.0
+    started = last = time.monotonic()
+    try:
+        while time.monotonic() - started < seconds:
+            size = int((await reader.readline()).strip(), 16)
+            if size == 0:
+                break
+            data = (await reader.readexactly(size + 2))[:-2]
+            now = time.monotonic()
+            if received:
+                max_gap = max(max_gap, now - last)
+            last = now
+            received += len(data)
+            if out:
+                out.write(data)
+    finally:
+        writer.close()
+        if out:
+            out.close()
+
+    elapsed = time.monotonic() - started
+    audio = max(0, received - WAV_HEADER_BYTES) / BYTES_PER_FRAME / 44100
+    return {"session": session_id, "audio_seconds": audio, "wall_seconds": elapsed, "max_gap": max_gap}
+
+async def run(args):
+    host, port = args.host, args.port
+    sessions = []
+    for i in range(args.sessions or args.listeners):
+        status, created = await request(host, port, "POST", f"/sessions?seed={args.seed + i}" if args.seed is not None else "/sessions")
+        if status != 201:
+            raise SystemExit(f"Could not create a session: {status} {created}")
+        sessions.append(created["id"])
+
+    async def poke():
+        # Exercise the control path half way through
+        await asyncio.sleep(args.seconds / 2)
+        for sid in sessions:
+            await request(host, port, "POST", f"/sessions/{sid}/control", {"brightness": 0.3, "tempo": 140})
+
+    listeners = [
+        listen(host, port, sessions[i % len(sessions)], args.seconds, args.out if i == 0 else None)
+        for i in range(args.listeners)
+    ]
+    results, _ = await asyncio.gather(asyncio.gather(*listeners), poke())
+    _, stats = await request(host, port, "GET", "/sessions")
+
+    for sid in sessions:
+        await request(host, port, "DELETE", f"/sessions/{sid}")
+
+    table = Table(title=f"{args.listeners} listeners on {len(sessions)} sessions")
+    for col in ("session", "audio s", "wall s", "realtime", "max gap ms"):
+        table.add_column(col, justify="right")
+    for r in results:
+        table.add_row(
+            r["session"], f"{r['audio_seconds']:.1f}", f"{r['wall_seconds']:.1f}",
+            f"{r['audio_seconds'] / r['wall_seconds']:.2f}x", f"{r['max_gap'] * 1000:.0f}",
+        )
+
+    console = Console()
+    console.print(table)
+    late = sum(s["late_chunks"] for s in stats)
+    dropped = sum(s["dropped_chunks"] for s in stats)
+    console.print(f"late chunks {late}, dropped chunks {dropped}")
+
+def main():
+    parser = argparse.ArgumentParser(description="NonomiBeat server test client")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--listeners", type=int, default=4)
+    parser.add_argument("--sessions", type=int, help="Sessions to spread the listeners over (default: one each)")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, help="Seed the sessions with seed, seed+1, ...")
+    parser.add_argument("--out", help="Save the first listener's stream to this WAV file")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
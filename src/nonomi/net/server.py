@@ -0,0 +1,370 @@
+import asyncio
+import json
+import struct
+import time
+import uuid
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+from rich.console import Console
+
+from src.nonomi.audio.engine import PianoFX
+from src.nonomi.audio.manager import AudioManager
+from src.nonomi.audio.modulation import parse_route
+from src.nonomi.audio.sampler import AudioSampler
+from src.nonomi.input.source import InputHub, InputSource
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           503: "Service Unavailable"}
+
+def wav_header(samplerate: int, channels: int = 2) -> bytes:
+    """Header for a 16-bit PCM WAV of unknown length, so a stream plays in anything that reads WAV."""
+    block_align = channels * 2
+    return (
+        b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, samplerate, samplerate * block_align, block_align, 16)
+        + b"data" + struct.pack("<I", 0xFFFFFFFF)
+    )
+
+class Session:
+    """One independent generator (its own AudioManager on the shared sampler), rendered a chunk at a
+    time, paced to real time plus `lead` seconds, and fanned out to every listener.
+
+    Each listener gets its own bounded queue; a listener that can't keep up loses its oldest chunks
+    instead of holding back the session. Nothing is rendered while nobody is listening.
+    """
+    def __init__(self, session_id: str, manager: AudioManager, chunk_frames: int, lead: float = 0.5,
+                 queue_chunks: int = 16, source: InputSource | None = None, input_spec: str | None = None):
+        self.id = session_id
+        self.manager = manager
+        self.source = source  # followed live, once per chunk
+        self.input_spec = input_spec
+        self.chunk_frames = chunk_frames
+        self.lead = lead
+        self.queue_chunks = queue_chunks
+        self.control_lock = asyncio.Lock()  # the command queue takes one producer at a time
+
+        self.listeners: set[asyncio.Queue] = set()
+        self.rendered = 0  # frames
+        self.late = 0      # chunks rendered after their play time
+        self.dropped = 0   # chunks a slow listener never got
+
+        self._listening = asyncio.Event()
+        self._chunk = np.zeros((chunk_frames, 2), dtype=np.float32)
+        self._pcm = np.zeros((chunk_frames, 2), dtype=np.int16)
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+        for queue in self.listeners:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(None)
+        self.listeners.clear()
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_chunks)
+        self.listeners.add(queue)
+        self._listening.set()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.listeners.discard(queue)
+        if not self.listeners:
+            self._listening.clear()
+
+    def _render_chunk(self) -> bytes:
+        """Worker thread: render one chunk of 16-bit PCM."""
+        manager = self.manager
+        start = time.perf_counter()
+
+        for offset in range(0, self.chunk_frames, manager.blocksize):
+            frames = min(manager.blocksize, self.chunk_frames - offset)
+            manager.fill_patterns()
+            np.clip(manager.render_block(frames), -1.0, 1.0, out=self._chunk[offset:offset + frames])
+
+        self._chunk *= 32767.0
+        self._pcm[:] = self._chunk
+
+        manager.metrics.record(
+            time.perf_counter() - start, self.chunk_frames, None, manager.voice_count(), len(manager.drums.voices),
+        )
+        return self._pcm.tobytes()
+
+    async def _run(self):
+        samplerate = self.manager.samplerate
+        while True:
+            await self._listening.wait()
+            started, sent = time.monotonic(), 0
+
+            while self.listeners:
+                ahead = sent / samplerate - (time.monotonic() - started)
+                if ahead > self.lead:
+                    await asyncio.sleep(ahead - self.lead)
+                    continue
+                if ahead < 0 and sent:
+                    self.late += 1
+
+                if self.source is not None:
+                    self.manager.update_inputs(self.source.features())
+
+                # Renders run one at a time per session, so the audio side of the command queue stays single-threaded
+                chunk = await asyncio.to_thread(self._render_chunk)
+                self.rendered += self.chunk_frames
+                sent += self.chunk_frames
+
+                for queue in self.listeners:
+                    if queue.full():
+                        queue.get_nowait()
+                        self.dropped += 1
+                    queue.put_nowait(chunk)
+
+    async def control(self, values: dict) -> dict:
+        """Apply control values (tempo, brightness, inputs, routes, regenerate, toggle_drums, toggle_melody).
+        `inputs` sets modulation inputs by name, `routes` replaces the session's routes (see parse_route)."""
+        manager = self.manager
+        parsed = self._parse_control(values)
+        applied = {}
+        async with self.control_lock:
+            if "tempo" in parsed:
+                applied["tempo"] = manager.set_tempo(parsed["tempo"])
+            if "brightness" in parsed:
+                manager.update_brightness(parsed["brightness"])
+                applied["brightness"] = True
+            if "inputs" in parsed:
+                manager.update_inputs(parsed["inputs"])
+                applied["inputs"] = True
+            if "routes" in parsed:
+                manager.modulation.set_routes(parsed["routes"])
+                applied["routes"] = True
+            if values.get("regenerate"):
+                applied["regenerate"] = await asyncio.to_thread(manager.regenerate)
+            if values.get("toggle_drums"):
+                applied["toggle_drums"] = manager.toggle_drums()
+            if values.get("toggle_melody"):
+                applied["toggle_melody"] = manager.toggle_melody()
+
+        return applied
+
+    def _parse_control(self, values) -> dict:
+        """Check and convert a control body before anything is applied, ValueError for bad shapes."""
+        if not isinstance(values, dict):
+            raise ValueError("control body must be a JSON object")
+
+        parsed = {}
+        try:
+            if "tempo" in values:
+                parsed["tempo"] = float(values["tempo"])
+            if "brightness" in values:
+                parsed["brightness"] = min(1.0, max(0.0, float(values["brightness"])))
+            if "inputs" in values:
+                if not isinstance(values["inputs"], dict):
+                    raise ValueError("inputs must be an object of name: value")
+                parsed["inputs"] = {str(name): float(value) for name, value in values["inputs"].items()}
+            if "routes" in values:
+                specs = values["routes"]
+                if not isinstance(specs, list) or not all(isinstance(spec, str) for spec in specs):
+                    raise ValueError("routes must be a list of SOURCE:TARGET[:CURVE[:AMOUNT[:SECONDS]]] strings")
+                parsed["routes"] = [parse_route(spec) for spec in specs]
+                self.manager.modulation.check_routes(parsed["routes"])
+        except TypeError as e:
+            raise ValueError(str(e)) from e
+
+        return parsed
+
+    def stats(self) -> dict:
+        return {
+            "id": self.id,
+            "seed": self.manager.seed,
+            "key": self.manager.composer.current_key,
+            "input": self.input_spec,
+            "listeners": len(self.listeners),
+            "rendered_seconds": self.rendered / self.manager.samplerate,
+            "late_chunks": self.late,
+            "dropped_chunks": self.dropped,
+            "dsp_load": self.manager.metrics.dsp_load,
+        }
+
+class NonomiServer:
+    """Hosts many generator sessions in one process and streams them over HTTP.
+
+        POST   /sessions[?seed=N&input=SPEC]  new session -> {"id": ..., "seed": ...}
+        GET    /sessions                stats for every session
+        GET    /sessions/<id>           stats for one session
+        GET    /sessions/<id>/stream    endless 16-bit WAV over chunked transfer encoding
+        POST   /sessions/<id>/control   JSON body, e.g. {"tempo": 120, "brightness": 0.3, "regenerate": true,
+                                        "routes": ["brightness:cutoff", "hue:drum_vol:smooth:1:2"]}
+        DELETE /sessions/<id>           stop and drop a session
+
+    Samples are loaded and processed once and shared by every session, and sessions following
+    the same input spec (see open_input) share one running source through an InputHub.
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, max_sessions: int = 32,
+                 samplerate: int = 44100, blocksize: int = 512, chunk_ms: float = 100.0, lead: float = 0.5,
+                 lazy_samples: bool = False, memory_budget_mb: float = 256.0, chord_cache_mb: float = 0.0,
+                 routes=None):
+        self.host = host
+        self.port = port
+        self.max_sessions = max_sessions
+        self.samplerate = samplerate
+        self.blocksize = blocksize
+        self.chunk_frames = max(blocksize, int(chunk_ms / 1000 * samplerate) // blocksize * blocksize)
+        self.lead = lead
+        self.chord_cache_mb = chord_cache_mb
+        self.routes = routes
+        self.console = Console()
+
+        self.sampler = AudioSampler(
+            sample_dir="src/samples/PianoSamples",
+            drum_dir="src/samples/DrumSamples",
+            lazy=lazy_samples,
+            memory_budget_mb=memory_budget_mb,
+        )
+        self.processed = None
+        self.sessions: dict[str, Session] = {}
+        self.inputs = InputHub()
+        self._server: asyncio.Server | None = None
+
+    async def start(self):
+        await self.sampler.start()
+        self.processed = await asyncio.to_thread(self.sampler.preprocess, PianoFX(samplerate=self.samplerate))
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.console.print(f"Serving on http://{self.host}:{self.port} :3", style="green")
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        for session in list(self.sessions.values()):
+            await session.close()
+        self.sessions.clear()
+        await self.inputs.close()
+        if self._server:
+            self._server.close()
+
+    async def create_session(self, seed: int | None = None, input_spec: str | None = None) -> Session:
+        def build():
+            return AudioManager(
+                sampler=self.sampler,
+                samplerate=self.samplerate,
+                blocksize=self.blocksize,
+                seed=seed,
+                chord_cache_mb=self.chord_cache_mb,
+                processed_samples=self.processed,
+                routes=self.routes,
+            )
+
+        source = await self.inputs.acquire(input_spec) if input_spec else None
+        try:
+            manager = await asyncio.to_thread(build)
+            session = Session(
+                uuid.uuid4().hex[:12], manager, self.chunk_frames, lead=self.lead, source=source, input_spec=input_spec,
+            )
+        except BaseException:
+            # Never got a session to hand it back on close
+            if source:
+                await self.inputs.release(input_spec)
+            raise
+        self.sessions[session.id] = session
+        session.start()
+        return session
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await reader.readline()
+            method, target, _ = request.decode("latin-1").split(" ", 2)
+
+            headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+            url = urlsplit(target)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            parts = [p for p in url.path.split("/") if p]
+            await self._route(method.upper(), parts, query, body, writer)
+
+        except ConnectionError:
+            pass
+        except (ValueError, OSError, asyncio.IncompleteReadError) as e:
+            # Bad numbers, JSON or input specs (missing files land here as OSError)
+            await self._respond(writer, 400, {"error": str(e) or "bad request"})
+        finally:
+            writer.close()
+
+    async def _route(self, method, parts, query, body, writer):
+        if not parts or parts[0] != "sessions" or len(parts) > 3:
+            return await self._respond(writer, 404, {"error": "not found"})
+
+        if len(parts) == 1:
+            if method == "GET":
+                return await self._respond(writer, 200, [s.stats() for s in self.sessions.values()])
+            if method == "POST":
+                if len(self.sessions) >= self.max_sessions:
+                    return await self._respond(writer, 503, {"error": "too many sessions"})
+                session = await self.create_session(
+                    int(query["seed"]) if "seed" in query else None, query.get("input"),
+                )
+                return await self._respond(writer, 201, {"id": session.id, "seed": session.manager.seed})
+            return await self._respond(writer, 405, {"error": "method not allowed"})
+
+        session = self.sessions.get(parts[1])
+        if session is None:
+            return await self._respond(writer, 404, {"error": "no such session"})
+
+        action = parts[2] if len(parts) == 3 else None
+        if action is None and method == "GET":
+            return await self._respond(writer, 200, session.stats())
+        if action is None and method == "DELETE":
+            del self.sessions[session.id]
+            await session.close()
+            if session.input_spec:
+                await self.inputs.release(session.input_spec)
+            return await self._respond(writer, 200, {"id": session.id})
+        if action == "control" and method == "POST":
+            values = json.loads(body or b"{}")
+            return await self._respond(writer, 200, await session.control(values))
+        if action == "stream" and method == "GET":
+            return await self._stream(session, writer)
+
+        return await self._respond(writer, 404, {"error": "not found"})
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload):
+        body = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+            + body
+        )
+        await writer.drain()
+
+    async def _stream(self, session: Session, writer: asyncio.StreamWriter):
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: audio/wav\r\nTransfer-Encoding: chunked\r\n"
+            b"Cache-Control: no-store\r\nConnection: close\r\n\r\n"
+        )
+        queue = session.subscribe()
+        try:
+            chunk = wav_header(self.samplerate)
+            while chunk is not None:
+                writer.write(b"%x\r\n" % len(chunk))
+                writer.write(chunk)
+                writer.write(b"\r\n")
+                await writer.drain()
+                chunk = await queue.get()
+
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            session.unsubscribe(queue)
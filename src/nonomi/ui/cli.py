@@ -9,9 +9,9 @@ from src.nonomi.core.core import NonomiBeat
 from src.nonomi.utils.visualizer import Visualizer
 
 class NonomiBeatCLI:
-    def __init__(self):
+    def __init__(self, **app_kwargs):
         self.viz = Visualizer()
-        self.app = NonomiBeat()
+        self.app = NonomiBeat(**app_kwargs)
         self.console = Console()
         self.ready_event = asyncio.Event()
         self.stop_viz = asyncio.Event()
@@ -40,7 +40,10 @@ class NonomiBeatCLI:
 
         await asyncio.gather(
             key_listener(),
-            self.viz.run_visualizer(self.app.manager.viz_buffer, self.console, self.stop_viz)
+            self.viz.run_visualizer(
+                self.app.manager.viz_buffer, self.console, self.stop_viz,
+                status=self.app.manager.metrics.summary,
+            )
         )
 
     async def start_backend(self, ready_event1: asyncio.Event):
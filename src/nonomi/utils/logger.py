@@ -1,4 +1,5 @@
 # Same logger as other but improved...sorta
+import asyncio
 import logging
 from pathlib import Path
 import os
@@ -27,3 +28,10 @@ def get_logger(name: str = "app_logger") -> logging.Logger:
     return logger
 
 default_logger = get_logger()
+
+async def log_metrics(metrics, interval: float = 10.0, logger: logging.Logger | None = None):
+    """Periodically flush an audio metrics summary to the log, from the event loop instead of the audio thread."""
+    logger = logger or default_logger
+    while True:
+        await asyncio.sleep(interval)
+        logger.info(f"[Audio] {metrics.summary()}")
@@ -0,0 +1,122 @@
+import numpy as np
+
+class AudioRingBuffer:
+    """Preallocated float32 circular buffer for tapping audio out of the callback.
+
+    Every frame is stored twice (at i and i + capacity), so the latest N frames are always
+    one contiguous slice and readers get a view instead of a copy. There is one writer;
+    any number of readers (visualizer, meters, recorders) can look at it. A reader racing
+    the writer may see a partly updated window, which is fine for analysis.
+    """
+    def __init__(self, capacity: int, channels: int = 2):
+        self.capacity = capacity
+        self.channels = channels
+        self._data = np.zeros((capacity * 2, channels), dtype=np.float32)
+        self.write_index = 0  # total frames ever written
+
+    def write(self, block: np.ndarray):
+        """Copy a (frames, channels) block in, no allocation."""
+        n = len(block)
+        if n > self.capacity:
+            self.write_index += n - self.capacity
+            block = block[-self.capacity:]
+            n = self.capacity
+
+        cap = self.capacity
+        pos = self.write_index % cap
+        first = min(n, cap - pos)
+
+        self._data[pos:pos + first] = block[:first]
+        self._data[pos + cap:pos + cap + first] = block[:first]
+        rest = n - first
+        if rest:
+            self._data[:rest] = block[first:]
+            self._data[cap:cap + rest] = block[first:]
+
+        self.write_index += n
+
+    def latest(self, frames: int) -> np.ndarray:
+        """View of the most recent `frames` frames (zeros before anything was written)."""
+        frames = min(frames, self.capacity)
+        end = self.write_index % self.capacity + self.capacity
+        return self._data[end - frames:end]
+
+    def frames_at(self, index: int, frames: int) -> np.ndarray:
+        """View of `frames` frames starting at absolute frame `index` (must still be in the buffer)."""
+        pos = index % self.capacity
+        return self._data[pos:pos + frames]
+
+    def since(self, read_index: int) -> tuple[np.ndarray, int]:
+        """Frames written after `read_index` (capped at capacity) and the index to pass next time."""
+        available = min(self.write_index - read_index, self.capacity)
+        return self.latest(max(0, available)), self.write_index
+
+class SharedAudioRing:
+    """Single-producer/single-consumer float32 audio ring in `multiprocessing.shared_memory`.
+
+    A small int64 header holds the write/read indices (total frames, each side writes only its
+    own) plus a few counters the producer publishes for stats. The producer copies a block in
+    before publishing the new write index, so the consumer can hand `readable()` views straight
+    to a file writer without copying anything out.
+    """
+    WRITE, READ, FRAMES, BUSY_NS, WAIT_NS, DONE, FAILED = range(7)
+    HEADER_SLOTS = 8
+
+    def __init__(self, capacity: int, channels: int = 2, name: str | None = None):
+        from multiprocessing import shared_memory
+
+        self.capacity = capacity
+        self.channels = channels
+        create = name is None
+        size = self.HEADER_SLOTS * 8 + capacity * channels * 4
+        # Only the creator tracks the block, so an attached process exiting doesn't unlink it
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size, track=create)
+
+        self.header = np.ndarray((self.HEADER_SLOTS,), dtype=np.int64, buffer=self.shm.buf)
+        self._data = np.ndarray((capacity, channels), dtype=np.float32, buffer=self.shm.buf,
+                                offset=self.HEADER_SLOTS * 8)
+        if create:
+            self.header[:] = 0
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def free(self) -> int:
+        return self.capacity - int(self.header[self.WRITE] - self.header[self.READ])
+
+    def write(self, block: np.ndarray) -> int:
+        """Producer: copy in as much of `block` as fits, returns the frames written."""
+        write = int(self.header[self.WRITE])
+        n = min(len(block), self.free())
+        pos = write % self.capacity
+        first = min(n, self.capacity - pos)
+
+        self._data[pos:pos + first] = block[:first]
+        if n > first:
+            self._data[:n - first] = block[first:n]
+
+        self.header[self.WRITE] = write + n
+        return n
+
+    def readable(self) -> list[np.ndarray]:
+        """Consumer: views of every unread frame, in order (two when the data wraps)."""
+        read = int(self.header[self.READ])
+        n = int(self.header[self.WRITE]) - read
+        pos = read % self.capacity
+        first = min(n, self.capacity - pos)
+
+        views = [self._data[pos:pos + first]] if first else []
+        if n > first:
+            views.append(self._data[:n - first])
+        return views
+
+    def consume(self, frames: int):
+        self.header[self.READ] += frames
+
+    def close(self, unlink: bool = False):
+        # Views into the block have to go before the mapping can be closed
+        del self.header, self._data
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
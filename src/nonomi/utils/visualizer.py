@@ -1,73 +1,98 @@
 import numpy as np
 import asyncio
-from collections import deque
-from rich.console import Console
+from typing import Callable
+from rich.console import Console, Group
 from rich.live import Live
 from rich.text import Text
 
+from src.nonomi.utils.ringbuffer import AudioRingBuffer
+
 BLOCKS = " ▁▂▃▄▅▆▇█"
+COLOURS = ("green", "yellow", "red")
+COLOUR_THRESHOLDS = np.array([0.4, 0.75], dtype=np.float32)
 
 class Visualizer:
-    def __init__(self, bars: int = 64, refresh_rate: int = 30, smoothing: float = 0.5):
+    def __init__(self, bars: int = 64, refresh_rate: int = 30, smoothing: float = 0.5,
+                 fft_size: int = 2048, samplerate: int = 44100):
         self.bars = bars
         self.refresh = refresh_rate
         self.smoothing = max(0.0, min(1.0, smoothing))
 
         self.smoothed = np.zeros(self.bars, dtype=np.float32)
-        self.samplerate = 44100
+        self.samplerate = samplerate
         self.magnitudes = np.zeros(self.bars, dtype=np.float32)
 
+        # Everything that only depends on the FFT size is built once here, not per frame
+        self.fft_size = fft_size
+        self._window  = np.hanning(fft_size).astype(np.float32)
+        self._bands   = self._band_matrix()
+        self._read_index = 0
+
         self.text = Text()
-        self.colour = "green"
+        self._cells = [char + char for char in BLOCKS]
+        self._last_levels: np.ndarray | None = None
+        self._last_colours: np.ndarray | None = None
+
+    def _band_matrix(self) -> np.ndarray:
+        """(bars, bins) matrix that averages FFT bins into log-spaced bars from 20 Hz to 16 kHz."""
+        freqs = np.fft.rfftfreq(self.fft_size, d=1 / self.samplerate)
+        edges = np.logspace(np.log10(20), np.log10(16000), self.bars + 1)
+        band_of_bin = np.searchsorted(edges, freqs, side="right") - 1
+
+        matrix = np.zeros((self.bars, len(freqs)), dtype=np.float32)
+        for i in range(self.bars):
+            bins = np.flatnonzero(band_of_bin == i)
+            if len(bins) == 0:
+                # Low bars are narrower than one bin, borrow the bin closest to the bar's centre
+                centre = np.sqrt(edges[i] * edges[i + 1])
+                bins = [int(np.argmin(np.abs(freqs - centre)))]
+            matrix[i, bins] = 1.0 / len(bins)
+
+        return matrix
 
     def _render(self, magnitudes: np.ndarray, width: int | None = None):
-        if width is None:
-            width = self.bars
-
-        for mag in magnitudes:
-            idx = int(np.clip(mag * (len(BLOCKS) -1 ), 0,len(BLOCKS) -1))
-            char = BLOCKS[idx]
-
-            if mag < 0.4:
-                self.colour = "green"
-            elif mag < 0.75:
-                self.colour = "yellow"
-            else:
-                self.colour = "red"
-            self.text.append(char + char, style=self.colour)
+        levels  = np.clip((magnitudes * (len(BLOCKS) - 1)).astype(np.int64), 0, len(BLOCKS) - 1)
+        colours = np.searchsorted(COLOUR_THRESHOLDS, magnitudes, side="right")
+
+        if (self._last_levels is not None
+                and np.array_equal(levels, self._last_levels)
+                and np.array_equal(colours, self._last_colours)):
+            return self.text
+
+        # One append per run of same-coloured bars instead of one per bar
+        text = Text()
+        levels_list, colours_list = levels.tolist(), colours.tolist()
+        start = 0
+        for i in range(1, len(levels_list) + 1):
+            if i == len(levels_list) or colours_list[i] != colours_list[start]:
+                text.append("".join(self._cells[lvl] for lvl in levels_list[start:i]), style=COLOURS[colours_list[start]])
+                start = i
+
+        self.text = text
+        self._last_levels, self._last_colours = levels, colours
         return self.text
 
-    async def run_visualizer(self, viz_buffer: deque, console: Console, stop_event: asyncio.Event):
+    async def run_visualizer(self, viz_buffer: AudioRingBuffer, console: Console, stop_event: asyncio.Event,
+                             status: Callable[[], str] | None = None):
         with Live("", console=console, refresh_per_second=self.refresh, transient=True) as live:
             while not stop_event.is_set():
                 self._viz(viz_buffer)
-                live.update(self._render(self.smoothed))
+                bars = self._render(self.smoothed)
+                live.update(Group(bars, Text(status(), style="dim")) if status else bars)
                 await asyncio.sleep(1/self.refresh)
 
-    def _viz(self, viz_buffer: deque):
-        if viz_buffer:
-            chunks = []
-            while viz_buffer:
-                chunks.append(viz_buffer.popleft())
-            audio = np.concatenate(chunks, axis=0)
-
-            mono = audio.mean(axis=1)
-
-            fft = np.abs(np.fft.rfft(mono, n=2048))
-            freqs = np.fft.rfftfreq(2048, d=1/self.samplerate)
-
-            log_min = np.log10(20)
-            log_max = np.log10(16000)
-            edges = np.logspace(log_min, log_max, self.bars + 1)
+    def _viz(self, viz_buffer: AudioRingBuffer):
+        # Always the latest fft_size frames, so consecutive frames overlap
+        if viz_buffer.write_index != self._read_index:
+            self._read_index = viz_buffer.write_index
+            mono = viz_buffer.latest(self.fft_size).mean(axis=1)
 
-            for i in range(self.bars):
-                mask = (freqs >= edges[i]) & (freqs < edges[i+1])
-                if mask.any():
-                    self.magnitudes[i] = fft[mask].mean()
+            fft = np.abs(np.fft.rfft(mono * self._window, n=self.fft_size))
+            np.matmul(self._bands, fft.astype(np.float32), out=self.magnitudes)
 
             peak = self.magnitudes.max()
             if peak > 0:
                 self.magnitudes /= peak
 
-            self.smoothed = self.smoothed * self.smoothing + self.magnitudes * (1 - self.smoothing)
-            self.text = Text()
+            self.smoothed *= self.smoothing
+            self.smoothed += self.magnitudes * (1 - self.smoothing)
@@ -0,0 +1,36 @@
+from src.nonomi.audio.commands import CommandQueue
+
+def test_fifo_order_and_empty():
+    queue = CommandQueue(capacity=4)
+    assert queue.pop() is None
+
+    for i in range(3):
+        assert queue.push("tempo", i)
+    assert len(queue) == 3
+    assert [queue.pop() for _ in range(3)] == [("tempo", 0), ("tempo", 1), ("tempo", 2)]
+    assert queue.pop() is None
+    assert len(queue) == 0
+
+def test_full_queue_drops_the_push():
+    queue = CommandQueue(capacity=2)
+    assert queue.push("a")
+    assert queue.push("b")
+    assert not queue.push("c")
+
+    assert len(queue) == 2
+    assert queue.pop() == ("a", None)
+    assert queue.push("c")
+    assert [queue.pop(), queue.pop()] == [("b", None), ("c", None)]
+
+def test_wraps_around_many_times():
+    queue = CommandQueue(capacity=3)
+    expected = 0
+    for i in range(50):
+        assert queue.push("step", i)
+        if i % 2:
+            while (item := queue.pop()) is not None:
+                assert item == ("step", expected)
+                expected += 1
+
+    assert expected == 50
+    assert len(queue) == 0
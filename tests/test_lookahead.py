@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from benchmarks.bench_audio import make_sampler
+from src.nonomi.audio.manager import AudioManager
+
+BLOCK = 512
+
+@pytest.fixture(scope="module")
+def sampler():
+    return make_sampler()
+
+def render(manager: AudioManager, blocks: int, reset_at=()) -> np.ndarray:
+    out = np.zeros((blocks * BLOCK, 2), dtype=np.float32)
+    for i in range(blocks):
+        if i in reset_at:
+            manager.reset_clock()
+        manager.fill_patterns()
+        out[i * BLOCK:(i + 1) * BLOCK] = manager.render_block(BLOCK)
+    return out
+
+def make(sampler) -> AudioManager:
+    return AudioManager(sampler, samplerate=44100, blocksize=BLOCK, seed=7)
+
+def test_reset_before_playing_changes_nothing(sampler):
+    blocks = 2 * make(sampler).clock.samples_per_bar // BLOCK
+    plain = render(make(sampler), blocks)
+
+    manager = make(sampler)
+    manager.reset_clock()
+    manager.reset_clock()
+    np.testing.assert_array_equal(render(manager, blocks), plain)
+    assert manager.metrics.missed_bars == 0
+
+def test_reset_rewinds_dropped_bars(sampler):
+    """Bars a reset drops are taken back, so resetting twice mid-bar plays the same as once."""
+    bar = make(sampler).clock.samples_per_bar // BLOCK
+    once, twice = make(sampler), make(sampler)
+    np.testing.assert_array_equal(render(once, bar + bar // 2), render(twice, bar + bar // 2))
+
+    once.reset_clock()
+    twice.reset_clock()
+    twice.reset_clock()
+    np.testing.assert_array_equal(render(once, 3 * bar), render(twice, 3 * bar))
+    assert once.metrics.missed_bars == twice.metrics.missed_bars == 0
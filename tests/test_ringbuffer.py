@@ -0,0 +1,62 @@
+import numpy as np
+
+from src.nonomi.utils.ringbuffer import AudioRingBuffer, SharedAudioRing
+
+def frames(start: int, count: int, channels: int = 2) -> np.ndarray:
+    return np.repeat(np.arange(start, start + count, dtype=np.float32)[:, None], channels, axis=1)
+
+def test_latest_is_contiguous_across_the_wrap():
+    ring = AudioRingBuffer(capacity=8)
+    ring.write(frames(0, 6))
+    ring.write(frames(6, 5))  # wraps
+
+    np.testing.assert_array_equal(ring.latest(8), frames(3, 8))
+    np.testing.assert_array_equal(ring.latest(3), frames(8, 3))
+    np.testing.assert_array_equal(ring.frames_at(5, 4), frames(5, 4))
+
+def test_oversized_write_keeps_the_tail():
+    ring = AudioRingBuffer(capacity=4)
+    ring.write(frames(0, 10))
+
+    assert ring.write_index == 10
+    np.testing.assert_array_equal(ring.latest(4), frames(6, 4))
+
+def test_since_caps_at_capacity():
+    ring = AudioRingBuffer(capacity=4, channels=1)
+    ring.write(frames(0, 3, channels=1))
+    block, index = ring.since(0)
+    np.testing.assert_array_equal(block, frames(0, 3, channels=1))
+
+    ring.write(frames(3, 6, channels=1))
+    block, index = ring.since(index)
+    assert index == 9
+    np.testing.assert_array_equal(block, frames(5, 4, channels=1))
+
+def test_shared_ring_reads_across_the_wrap():
+    ring = SharedAudioRing(capacity=8)
+    try:
+        assert ring.write(frames(0, 6)) == 6
+        ring.consume(4)
+        assert ring.write(frames(6, 10)) == 6  # only what fits
+
+        views = ring.readable()
+        assert len(views) == 2
+        np.testing.assert_array_equal(np.concatenate(views), frames(4, 8))
+
+        ring.consume(8)
+        assert ring.readable() == []
+        assert ring.free() == 8
+    finally:
+        ring.close(unlink=True)
+
+def test_shared_ring_attaches_by_name():
+    ring = SharedAudioRing(capacity=4)
+    try:
+        other = SharedAudioRing(capacity=4, name=ring.name)
+        ring.write(frames(0, 3))
+        np.testing.assert_array_equal(np.concatenate(other.readable()), frames(0, 3))
+        other.consume(3)
+        assert ring.free() == 4
+        other.close()
+    finally:
+        ring.close(unlink=True)
@@ -0,0 +1,63 @@
+import numpy as np
+
+from src.nonomi.audio.voices import VoicePool
+
+def tone(frames: int = 44100) -> np.ndarray:
+    return np.full((frames, 2), 0.5, dtype=np.float32)
+
+def started_pool(voices: int, **kwargs) -> VoicePool:
+    """A pool with `voices` voices that have already made a sound."""
+    pool = VoicePool(tail_threshold=None, **kwargs)
+    for _ in range(voices):
+        pool.trigger(tone())
+    pool.mix_into(np.zeros((64, 2), dtype=np.float32))
+    return pool
+
+def test_steal_fades_the_oldest_voice():
+    pool = started_pool(4, capacity=4, max_voices=4)
+    pool.trigger(tone())
+
+    assert pool.sounding == 4
+    assert pool.count == 5
+    fading = np.flatnonzero(pool.fades[:pool.count])
+    assert list(pool.ages[fading]) == [0]
+
+def test_full_pool_only_cuts_fading_voices():
+    pool = started_pool(8, capacity=9, max_voices=8)
+    for _ in range(2):
+        live_before = {int(age) for age, fade in zip(pool.ages[:pool.count], pool.fades[:pool.count]) if fade == 0}
+        pool.trigger(tone())
+        live_after = {int(age) for age in pool.ages[:pool.count]}
+
+        # Whatever was sounding is still there, fading or not
+        assert live_before <= live_after
+        assert pool.sounding == pool.max_voices
+        assert pool.count <= pool.capacity
+
+def test_unstarted_voice_is_released_without_fade():
+    pool = VoicePool(capacity=2, max_voices=2, tail_threshold=None)
+    for _ in range(3):
+        pool.trigger(tone())
+
+    assert pool.count == 2
+    assert pool.sounding == 2
+    assert not pool.fades[:pool.count].any()
+
+def test_fade_out_ends_the_voice():
+    pool = started_pool(2, capacity=2, max_voices=2, fade_samples=32)
+    pool.trigger(tone())
+    bus = np.zeros((64, 2), dtype=np.float32)
+    pool.mix_into(bus)
+
+    assert pool.count == 2
+    assert not pool.fades[:pool.count].any()
+
+def test_mix_respects_delay_and_velocity():
+    pool = VoicePool(capacity=4, tail_threshold=None)
+    pool.trigger(tone(100), velocity=0.5, delay=10)
+    bus = np.zeros((64, 2), dtype=np.float32)
+    pool.mix_into(bus)
+
+    assert not bus[:10].any()
+    np.testing.assert_allclose(bus[10:], 0.25)
+    assert pool.positions[0] == 54